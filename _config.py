@@ -0,0 +1,40 @@
+# Cached access to configuration values from config.env / environment
+
+import functools
+import os
+from typing import Dict, Union
+from dotenv import load_dotenv
+
+
+@functools.lru_cache(maxsize=1)
+def load() -> Dict[str, Union[str, int, bool, None]]:
+    """
+    Load config.env once and return resolved configuration values.
+
+    Returns:
+        Dictionary with normalized configuration values
+    """
+    load_dotenv("config.env")
+    return {
+        "ANALYZER_TYPE": os.environ.get("ANALYZER_TYPE", "gemini").strip().lower(),
+        "GEMINI_MODEL_NAME": os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-pro"),
+        "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY") or None,
+        "OPENROUTER_MODEL_NAME": os.environ.get("OPENROUTER_MODEL_NAME", "google/gemini-3-pro-preview"),
+        "OPENROUTER_CONCURRENCY": int(os.environ.get("OPENROUTER_CONCURRENCY", "8")),
+        "OPENROUTER_RPM": float(os.environ.get("OPENROUTER_RPM", "60")),
+        "GOOGLE_CLOUD_PROJECT_ID": os.environ.get("GOOGLE_CLOUD_PROJECT_ID"),
+        "VERTEX_AI_LOCATION": os.environ.get("VERTEX_AI_LOCATION", "global"),
+        "GEMINI_UPLOAD_BUCKET": os.environ.get("GEMINI_UPLOAD_BUCKET") or None,
+        "GEMINI_DELETE_UPLOADS": os.environ.get("GEMINI_DELETE_UPLOADS", "false").strip().lower() in ("1", "true", "yes"),
+        "PROMPT_TYPE": os.environ.get("PROMPT_TYPE", "general").strip().lower(),
+        "GEMINI_MAX_CONCURRENT_REQUESTS": int(os.environ.get("GEMINI_MAX_CONCURRENT_REQUESTS", "4")),
+        "GEMINI_RPM": float(os.environ.get("GEMINI_RPM", "60")),
+        "VIDEO_PARALLELISM": int(os.environ.get("VIDEO_PARALLELISM", "2")),
+        "FFMPEG_PARALLEL_CHUNKS": int(os.environ.get("FFMPEG_PARALLEL_CHUNKS") or os.cpu_count() or 1),
+        "REQUIRE_JSON_KEYFRAMES": os.environ.get("REQUIRE_JSON_KEYFRAMES", "false").strip().lower() in ("1", "true", "yes"),
+    }
+
+
+def clear_cache() -> None:
+    """Drop cached configuration so the next load() re-reads the environment (used by tests)."""
+    load.cache_clear()
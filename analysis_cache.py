@@ -0,0 +1,68 @@
+# Persistent cache of chunk analyses keyed by video content, prompt and model
+
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+from file_utils import ensure_directory_exists, atomic_write_text
+
+# Hidden directory inside temporary/, so cleanup_temp_directory keeps it between runs
+CACHE_DIR = os.path.join("temporary", ".analysis_cache")
+
+# When True, load() always misses (set by --force); fresh results are still stored
+bypass_reads = False
+
+# sha256 of file contents keyed by (path, size, mtime) so unchanged files are hashed once
+_FILE_DIGEST_CACHE: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_sha256(path: str) -> str:
+    """Return hex sha256 of a file, streaming it in 1 MiB blocks."""
+    st = os.stat(path)
+    cache_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _FILE_DIGEST_CACHE.get(cache_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for buf in iter(lambda: f.read(1 << 20), b""):
+                h.update(buf)
+        digest = _FILE_DIGEST_CACHE[cache_key] = h.hexdigest()
+    return digest
+
+
+def cache_path_for(model_name: str, video_path: str, prompt: str) -> str:
+    """
+    Build cache file path keyed by sha256 of prompt and video content hash.
+
+    The prompt already encodes prompt type, chunk position and the JSON KeyFrames postfix,
+    so any change to those produces a different key.
+
+    Args:
+        model_name: Model that produced (or will produce) the analysis
+        video_path: Path to the video chunk
+        prompt: Prompt sent along with the video
+
+    Returns:
+        Path to the cache file for this request
+    """
+    key = hashlib.sha256()
+    key.update(prompt.encode("utf-8"))
+    key.update(file_sha256(video_path).encode("ascii"))
+    model_tag = model_name.replace("/", "_")
+    return os.path.join(CACHE_DIR, f"{model_tag}_{key.hexdigest()}.txt")
+
+
+def load(cache_path: str) -> Optional[str]:
+    """Return cached analysis text, or None if there is no entry (or reads are bypassed)."""
+    if bypass_reads:
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def store(cache_path: str, text: str) -> None:
+    """Atomically store analysis text so readers never see a partial file."""
+    ensure_directory_exists(CACHE_DIR)
+    atomic_write_text(cache_path, text)
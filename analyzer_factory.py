@@ -1,34 +1,49 @@
 # Factory for creating video analyzers based on configuration
 
-import os
-from typing import Protocol, Dict, List
-from dotenv import load_dotenv
+import functools
+import importlib
+from typing import TYPE_CHECKING, Dict, List
+import _config
 
-# Load environment variables
-load_dotenv("config.env")
+# Analyzer type -> (module, class, config key of model name, description).
+# Modules are imported lazily so unused backends never pay their import cost.
+_ANALYZER_REGISTRY = {
+    "gemini": ("gemini_analyzer", "GeminiAnalyzer", "GEMINI_MODEL_NAME", "Google Gemini via Vertex AI"),
+    "openrouter": ("openrouter_analyzer", "OpenRouterAnalyzer", "OPENROUTER_MODEL_NAME", "OpenRouter API"),
+}
 
+if TYPE_CHECKING:
+    # Only used for static type checking; nothing is built at import time
+    from typing import Protocol
 
-class VideoAnalyzer(Protocol):
-    """Protocol defining the interface for video analyzers."""
+    class VideoAnalyzer(Protocol):
+        """Protocol defining the interface for video analyzers."""
 
-    def analyze_video_chunk(self, video_path: str, chunk_info: Dict) -> str:
-        """Analyze a single video chunk."""
-        ...
+        def analyze_video_chunk(self, video_path: str, chunk_info: Dict) -> str:
+            """Analyze a single video chunk."""
+            ...
 
-    def combine_analyses(self, analyses: List[str], original_video_path: str) -> str:
-        """Combine multiple chunk analyses into a single comprehensive analysis."""
-        ...
+        def combine_analyses(self, analyses: List[str], original_video_path: str) -> str:
+            """Combine multiple chunk analyses into a single comprehensive analysis."""
+            ...
 
-    def analyze_single_video(self, video_path: str) -> str:
-        """Analyze a single video file (when no chunking is needed)."""
-        ...
+        def analyze_single_video(self, video_path: str) -> str:
+            """Analyze a single video file (when no chunking is needed)."""
+            ...
+
+
+@functools.lru_cache(maxsize=None)
+def _load_analyzer_class(analyzer_type: str) -> type:
+    """Import and return the analyzer class registered for analyzer_type (once per process)."""
+    module_name, class_name = _ANALYZER_REGISTRY[analyzer_type][:2]
+    return getattr(importlib.import_module(module_name), class_name)
 
 
 def create_analyzer(
     analyzer_type: str = None,
     prompt_type: str = None,
     require_json_keyframes: bool = None,
-) -> VideoAnalyzer:
+) -> "VideoAnalyzer":
     """
     Create appropriate video analyzer based on configuration.
 
@@ -44,26 +59,19 @@ def create_analyzer(
         ValueError: If analyzer_type is not supported
     """
     if analyzer_type is None:
-        analyzer_type = os.getenv("ANALYZER_TYPE", "gemini").strip().lower()
+        analyzer_type = _config.load()["ANALYZER_TYPE"]
 
-    if analyzer_type == "gemini":
-        from gemini_analyzer import GeminiAnalyzer
-        return GeminiAnalyzer(
-            prompt_type=prompt_type,
-            require_json_keyframes=require_json_keyframes,
-        )
-    elif analyzer_type == "openrouter":
-        from openrouter_analyzer import OpenRouterAnalyzer
-        return OpenRouterAnalyzer(
-            prompt_type=prompt_type,
-            require_json_keyframes=require_json_keyframes,
-        )
-    else:
+    if analyzer_type not in _ANALYZER_REGISTRY:
         raise ValueError(
             f"Unknown analyzer type: '{analyzer_type}'. "
-            f"Supported types: 'gemini', 'openrouter'"
+            f"Supported types: {', '.join(repr(t) for t in _ANALYZER_REGISTRY)}"
         )
 
+    return _load_analyzer_class(analyzer_type)(
+        prompt_type=prompt_type,
+        require_json_keyframes=require_json_keyframes,
+    )
+
 
 def get_analyzer_info() -> Dict[str, str]:
     """
@@ -72,25 +80,20 @@ def get_analyzer_info() -> Dict[str, str]:
     Returns:
         Dictionary with analyzer type and model name
     """
-    analyzer_type = os.getenv("ANALYZER_TYPE", "gemini").strip().lower()
+    config = _config.load()
+    analyzer_type = config["ANALYZER_TYPE"]
 
-    if analyzer_type == "gemini":
-        model_name = os.getenv("GEMINI_MODEL_NAME", "gemini-3-pro-preview")
-        return {
-            "type": "gemini",
-            "model": model_name,
-            "description": "Google Gemini via Vertex AI",
-        }
-    elif analyzer_type == "openrouter":
-        model_name = os.getenv("OPENROUTER_MODEL_NAME", "google/gemini-3-pro-preview")
-        return {
-            "type": "openrouter",
-            "model": model_name,
-            "description": "OpenRouter API",
-        }
-    else:
+    entry = _ANALYZER_REGISTRY.get(analyzer_type)
+    if entry is None:
         return {
             "type": analyzer_type,
             "model": "unknown",
             "description": f"Unknown analyzer type: {analyzer_type}",
         }
+
+    _, _, model_key, description = entry
+    return {
+        "type": analyzer_type,
+        "model": config[model_key],
+        "description": description,
+    }
@@ -1,9 +1,20 @@
 # File utilities for video analysis project
 
+import logging
 import os
 import shutil
+import stat
+import tempfile
+import threading
+from datetime import datetime
 from typing import List, Tuple
 
+log = logging.getLogger(__name__)
+
+# Process umask; os.umask can only be read by setting it, so do it once at import time
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 
 def ensure_directory_exists(directory_path: str) -> None:
     """
@@ -12,9 +23,12 @@ def ensure_directory_exists(directory_path: str) -> None:
     Args:
         directory_path: Path to the directory to create
     """
-    if not os.path.exists(directory_path):
+    # Single mkdir attempt instead of exists() + makedirs(); also avoids the race between them
+    try:
         os.makedirs(directory_path)
-        print(f"Created directory: {directory_path}")
+    except FileExistsError:
+        return
+    log.info(f"Created directory: {directory_path}")
 
 
 def get_temp_directory() -> str:
@@ -33,19 +47,24 @@ def cleanup_temp_directory(temp_dir: str) -> None:
     """
     Remove all files from temporary directory.
     
+    Hidden entries (e.g. the .analysis_cache directory) are kept between runs.
+    
     Args:
         temp_dir: Path to the temporary directory to clean up
     """
     if os.path.exists(temp_dir):
-        for filename in os.listdir(temp_dir):
-            file_path = os.path.join(temp_dir, filename)
-            try:
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
+        # scandir caches entry types, avoiding a stat() per entry
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
+                except Exception as e:
+                    log.error(f"Error deleting {entry.path}: {e}")
 
 
 def get_video_chunks_info(temp_dir: str) -> List[Tuple[str, str]]:
@@ -58,18 +77,54 @@ def get_video_chunks_info(temp_dir: str) -> List[Tuple[str, str]]:
     Returns:
         List of tuples (chunk_filename, analysis_filename)
     """
-    chunks_info = []
-    if os.path.exists(temp_dir):
-        video_files = [f for f in os.listdir(temp_dir) if f.endswith('.mp4')]
-        video_files.sort()  # Sort to ensure proper order
-        
-        for video_file in video_files:
-            chunk_path = os.path.join(temp_dir, video_file)
-            analysis_filename = os.path.splitext(video_file)[0] + "_analysis.txt"
-            analysis_path = os.path.join(temp_dir, analysis_filename)
-            chunks_info.append((chunk_path, analysis_path))
+    if not os.path.exists(temp_dir):
+        return []
+    
+    with os.scandir(temp_dir) as entries:
+        video_files = [
+            e.name for e in entries
+            if e.name.endswith('.mp4') and e.is_file(follow_symlinks=False)
+        ]
+    video_files.sort()  # Sort to ensure proper order
+    
+    # Extension length is known, so slice instead of os.path.splitext
+    return [
+        (os.path.join(temp_dir, name), os.path.join(temp_dir, name[:-4] + "_analysis.txt"))
+        for name in video_files
+    ]
+
+
+def prefetch_file(file_path: str) -> None:
+    """
+    Ask the OS to load a file into page cache in the background.
+    
+    Used to warm the next video chunk while the current one is being analyzed.
     
-    return chunks_info
+    Args:
+        file_path: Path to the file to prefetch
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+        return
+    
+    def _read_through():
+        try:
+            with open(file_path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+        except OSError:
+            pass
+    
+    threading.Thread(target=_read_through, daemon=True).start()
 
 
 def generate_output_filename(video_path: str) -> str:
@@ -85,6 +140,33 @@ def generate_output_filename(video_path: str) -> str:
     return os.path.splitext(video_path)[0] + ".txt"
 
 
+def atomic_write_text(output_path: str, content: str) -> None:
+    """
+    Write text to a sibling temp file and atomically swap it into place.
+    
+    Readers never observe a truncated file, even if the process is killed mid-write.
+    
+    Args:
+        output_path: Destination file path
+        content: Text to write (UTF-8)
+    """
+    dirname = os.path.dirname(output_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".analysis-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        # mkstemp creates 0600; keep the target's mode, or use what open() would give a new file
+        try:
+            mode = stat.S_IMODE(os.stat(output_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
 def save_analysis_to_file(content: str, output_path: str, video_path: str) -> None:
     """
     Save analysis content to file with metadata.
@@ -94,8 +176,9 @@ def save_analysis_to_file(content: str, output_path: str, video_path: str) -> No
         output_path: Path to save the analysis
         video_path: Original video file path for metadata
     """
-    with open(output_path, "w", encoding="utf-8") as output_file:
-        output_file.write(f"Video analysis for: {video_path}\n")
-        output_file.write(f"Timestamp: {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output_file.write("=" * 60 + "\n\n")
-        output_file.write(content)
+    header = (
+        f"Video analysis for: {video_path}\n"
+        f"Timestamp: {datetime.now():%Y-%m-%d %H:%M:%S}\n"
+        f"{'=' * 60}\n\n"
+    )
+    atomic_write_text(output_path, header + content)
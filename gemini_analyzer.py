@@ -1,18 +1,85 @@
 # Gemini API analyzer for video content analysis
 
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
+import functools
+import json
+import logging
 import mimetypes
 import os
+import re
+import threading
 import time
-import random
-from typing import Dict, List
-from google.api_core.exceptions import TooManyRequests, ResourceExhausted
-from dotenv import load_dotenv
-import xml.etree.ElementTree as ET
+from string import Template
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from google.api_core.exceptions import TooManyRequests, ResourceExhausted, PreconditionFailed, NotFound
+import _config
+import analysis_cache
+from rate_limiter import RateLimiter
 
-# Load environment variables
-load_dotenv("config.env")
+log = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from vertexai.generative_models import GenerativeModel, Part
+
+# Matches {key} placeholders in XML prompt templates
+_PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+# MIME types resolved per file extension; chunks are always .mp4
+_MIME_CACHE: Dict[str, str] = {".mp4": "video/mp4"}
+
+
+def _guess_mime_type(video_path: str) -> str:
+    """Return MIME type for a video file, defaulting to video/mp4."""
+    ext = os.path.splitext(video_path)[1].lower()
+    mime_type = _MIME_CACHE.get(ext)
+    if mime_type is None:
+        mime_type = _MIME_CACHE.setdefault(ext, mimetypes.guess_type(video_path)[0] or "video/mp4")
+    return mime_type
+
+# Global cap on in-flight Gemini requests shared by all analyzer instances and threads
+_request_slots = threading.BoundedSemaphore(_config.load()["GEMINI_MAX_CONCURRENT_REQUESTS"])
+# Process-wide requests-per-minute budget, shared by every analyzer instance and thread
+_request_rate = RateLimiter(_config.load()["GEMINI_RPM"])
+
+
+def _retry_after_seconds(error: Exception) -> float:
+    """Extract Retry-After (seconds) from an API error's HTTP response, or 0 if absent."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return 0.0
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@functools.lru_cache(maxsize=8)
+def _get_model(project_id: str, location: str, model_name: str) -> "GenerativeModel":
+    """Initialize Vertex AI and build a GenerativeModel once per (project, location, model)."""
+    import vertexai
+    from vertexai.generative_models import GenerativeModel
+    
+    vertexai.init(project=project_id, location=location)
+    return GenerativeModel(model_name)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_storage_client(project_id: str):
+    """Create a single google-cloud-storage client per project."""
+    from google.cloud import storage
+    
+    return storage.Client(project=project_id)
+
+
+# gs:// URIs of already uploaded chunks keyed by (sha256, bucket)
+_GCS_URI_CACHE: Dict[Tuple[str, str], str] = {}
+
+
+@functools.lru_cache(maxsize=32)
+def _read_prompt_file(path: str) -> str:
+    """Read a prompt file once per process; later calls are served from memory."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 
 class GeminiAnalyzer:
@@ -30,21 +97,29 @@ class GeminiAnalyzer:
             require_json_keyframes: When True, ask model to ensure KeyFrames are emitted as JSON
         """
         # Use environment variables as defaults
-        self.project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT_ID")
-        self.location = location or os.getenv("VERTEX_AI_LOCATION", "global")
-        self.model_name = model_name or os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-pro")
+        config = _config.load()
+        self.project_id = project_id or config["GOOGLE_CLOUD_PROJECT_ID"]
+        self.location = location or config["VERTEX_AI_LOCATION"]
+        self.model_name = model_name or config["GEMINI_MODEL_NAME"]
         
         if not self.project_id:
             raise ValueError("Google Cloud Project ID must be provided via GOOGLE_CLOUD_PROJECT_ID env variable or parameter")
         
-        vertexai.init(project=self.project_id, location=self.location)
-        self.model = GenerativeModel(self.model_name)
+        # Vertex AI SDK is heavy to import; defer it until a Gemini analyzer is actually created
+        from vertexai.generative_models import Part
+        self._Part = Part
+        
+        self.model = _get_model(self.project_id, self.location, self.model_name)
+        # Optional GCS bucket for uploading chunks once and passing them by URI
+        self.gcs_bucket = config["GEMINI_UPLOAD_BUCKET"]
+        # Remove uploaded chunks once analyzed instead of keeping them for reuse
+        self.delete_uploads = config["GEMINI_DELETE_UPLOADS"]
         # Prompt selection
-        self.prompt_type = (prompt_type or os.getenv("PROMPT_TYPE", "general")).strip().lower()
+        self.prompt_type = (prompt_type or config["PROMPT_TYPE"]).strip().lower()
         self.require_json_keyframes = (
             require_json_keyframes
             if require_json_keyframes is not None
-            else os.getenv("REQUIRE_JSON_KEYFRAMES", "false").strip().lower() in ("1", "true", "yes")
+            else config["REQUIRE_JSON_KEYFRAMES"]
         )
         
         # Load prompts from XML files
@@ -64,8 +139,17 @@ class GeminiAnalyzer:
         selected_prompt_file = self.prompt_map.get(self.prompt_type, self.prompt_map["general"])
         self.chunk_prompt_template = self._load_xml_prompt(selected_prompt_file)
         self.combine_prompt_template = self._load_xml_prompt("combine_analysis_prompt.xml")
+        
+        # Shared XML postfix with JSON KeyFrames instructions, resolved once per instance
+        self._postfix = ""
+        if self.require_json_keyframes:
+            postfix_path = os.path.join(self.prompts_dir, "common_keyframes_postfix.xml")
+            if os.path.exists(postfix_path):
+                self._postfix = "\n\n" + _read_prompt_file(postfix_path).strip()
+            else:
+                log.warning("Warning: common_keyframes_postfix.xml not found; proceeding without JSON KeyFrames postfix")
     
-    def _load_xml_prompt(self, filename: str) -> str:
+    def _load_xml_prompt(self, filename: str) -> Template:
         """
         Load XML prompt template from file.
         
@@ -73,30 +157,28 @@ class GeminiAnalyzer:
             filename: Name of the XML prompt file
             
         Returns:
-            Raw XML content as string
+            string.Template with {key} placeholders converted to ${key}
         """
         prompt_path = os.path.join(self.prompts_dir, filename)
         if not os.path.exists(prompt_path):
             raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
         
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        # Escape literal '$' first so only our placeholders are substituted
+        text = _read_prompt_file(prompt_path).replace("$", "$$")
+        return Template(_PLACEHOLDER_RE.sub(r"${\1}", text))
     
-    def _format_prompt(self, template: str, **params) -> str:
+    def _format_prompt(self, template: Template, **params) -> str:
         """
         Format XML prompt template with parameters.
         
         Args:
-            template: XML template string
+            template: Prompt template loaded by _load_xml_prompt
             **params: Parameters to substitute in template
             
         Returns:
             Formatted prompt string
         """
-        formatted = template
-        for key, value in params.items():
-            formatted = formatted.replace(f"{{{key}}}", str(value))
-        return formatted
+        return template.safe_substitute(params)
     
     def _retry_with_backoff(self, func, *args, max_retries: int = 5, **kwargs):
         """
@@ -112,24 +194,26 @@ class GeminiAnalyzer:
         """
         for attempt in range(max_retries + 1):
             try:
-                return func(*args, **kwargs)
+                # Wait for quota before taking a slot so throttled callers don't hold slots idle
+                _request_rate.acquire()
+                # Shared slot limit shapes concurrency across threads, so no jitter is needed
+                with _request_slots:
+                    return func(*args, **kwargs)
             except (TooManyRequests, ResourceExhausted) as e:
                 if attempt == max_retries:
-                    print(f"❌ Превышено максимальное количество попыток ({max_retries})")
+                    log.error(f"❌ Превышено максимальное количество попыток ({max_retries})")
                     raise e
                 
-                # Calculate delay with exponential backoff + jitter
-                base_delay = 2 ** attempt  # 2, 4, 8, 16, 32 seconds
-                jitter = random.uniform(0.5, 1.5)  # Random factor to avoid thundering herd
-                delay = base_delay * jitter
+                # Deterministic exponential backoff, honoring Retry-After when the API sends it
+                delay = max(2 ** attempt, _retry_after_seconds(e))
                 
-                print(f"⏳ Получена ошибка 429 (лимит API). Пауза {delay:.1f} секунд... (попытка {attempt + 1}/{max_retries})")
+                log.warning(f"⏳ Получена ошибка 429 (лимит API). Пауза {delay:.1f} секунд... (попытка {attempt + 1}/{max_retries})")
                 time.sleep(delay)
             except Exception as e:
                 # For other exceptions, don't retry
                 raise e
     
-    def _create_video_part(self, video_path: str) -> Part:
+    def _create_video_part(self, video_path: str) -> "Part":
         """
         Create a Part object from video file.
         
@@ -140,15 +224,67 @@ class GeminiAnalyzer:
             Part object for Gemini API
         """
         # Get MIME type
-        mime_type = mimetypes.guess_type(video_path)[0]
-        if not mime_type:
-            mime_type = "video/mp4"  # Default to mp4
+        mime_type = _guess_mime_type(video_path)
         
-        # Read video data
+        # Upload once to GCS and reference by URI so retries don't resend the bytes
+        if self.gcs_bucket:
+            return self._Part.from_uri(self._upload_to_gcs(video_path), mime_type=mime_type)
+        
+        # Inline data is a protobuf bytes field, so the SDK needs a real bytes object
         with open(video_path, "rb") as video_file:
             video_data = video_file.read()
         
-        return Part.from_data(video_data, mime_type=mime_type)
+        return self._Part.from_data(video_data, mime_type=mime_type)
+    
+    def _upload_to_gcs(self, video_path: str) -> str:
+        """
+        Upload video file to the configured GCS bucket under a content-hashed name.
+        
+        Args:
+            video_path: Path to the video file
+            
+        Returns:
+            gs:// URI of the uploaded object
+        """
+        digest = analysis_cache.file_sha256(video_path)
+        cache_key = (digest, self.gcs_bucket)
+        gcs_uri = _GCS_URI_CACHE.get(cache_key)
+        if gcs_uri:
+            return gcs_uri
+        
+        object_name = self._gcs_object_name(video_path, digest)
+        blob = _get_storage_client(self.project_id).bucket(self.gcs_bucket).blob(object_name)
+        try:
+            log.info(f"Uploading {os.path.basename(video_path)} to gs://{self.gcs_bucket}/{object_name}")
+            # if_generation_match=0: only create, never overwrite identical content
+            blob.upload_from_filename(video_path, content_type=_guess_mime_type(video_path), if_generation_match=0)
+        except PreconditionFailed:
+            pass  # Same content already uploaded earlier
+        
+        gcs_uri = f"gs://{self.gcs_bucket}/{object_name}"
+        _GCS_URI_CACHE[cache_key] = gcs_uri
+        return gcs_uri
+    
+    @staticmethod
+    def _gcs_object_name(video_path: str, digest: str) -> str:
+        """Content-addressed object name for an uploaded chunk."""
+        return f"video_chunks/{digest}{os.path.splitext(video_path)[1].lower()}"
+    
+    def _delete_from_gcs(self, video_path: str) -> None:
+        """
+        Delete a chunk uploaded by this process from the GCS bucket.
+        
+        Args:
+            video_path: Path to the video file passed to _upload_to_gcs
+        """
+        digest = analysis_cache.file_sha256(video_path)
+        if _GCS_URI_CACHE.pop((digest, self.gcs_bucket), None) is None:
+            return  # Not uploaded by this process (or already deleted)
+        blob = _get_storage_client(self.project_id).bucket(self.gcs_bucket).blob(self._gcs_object_name(video_path, digest))
+        try:
+            blob.delete()
+        except NotFound:
+            pass
     
     def _generate_chunk_prompt(self, chunk_info: Dict) -> str:
         """
@@ -169,15 +305,7 @@ class GeminiAnalyzer:
             end_time_minutes=f"{chunk_info.get('end_time_minutes', chunk_info['duration']/60):.1f}",
             duration_minutes=f"{chunk_info['duration']/60:.1f}"
         )
-        if self.require_json_keyframes:
-            # Append shared XML postfix with JSON KeyFrames instructions
-            postfix_path = os.path.join(self.prompts_dir, "common_keyframes_postfix.xml")
-            if os.path.exists(postfix_path):
-                with open(postfix_path, "r", encoding="utf-8") as pf:
-                    base_prompt += "\n\n" + pf.read().strip()
-            else:
-                print("Warning: common_keyframes_postfix.xml not found; proceeding without JSON KeyFrames postfix")
-        return base_prompt
+        return base_prompt + self._postfix
     
     def analyze_video_chunk(self, video_path: str, chunk_info: Dict) -> str:
         """
@@ -190,23 +318,153 @@ class GeminiAnalyzer:
         Returns:
             Analysis text from Gemini
         """
-        print(f"Analyzing chunk {chunk_info['index']+1}/{chunk_info['total_chunks']}: {os.path.basename(video_path)}")
-        
-        # Create video part
-        video_part = self._create_video_part(video_path)
+        log.info(f"Analyzing chunk {chunk_info['index']+1}/{chunk_info['total_chunks']}: {os.path.basename(video_path)}")
         
         # Generate appropriate prompt
         prompt = self._generate_chunk_prompt(chunk_info)
         
-        print(f"Using prompt: {prompt[:100]}...")
+        # Reuse a previous answer for the same video bytes, prompt and model
+        cache_path = self._cache_path_for(video_path, prompt)
+        cached = analysis_cache.load(cache_path)
+        if cached is not None:
+            log.info(f"Using cached analysis: {os.path.basename(cache_path)}")
+            return cached
+        
+        # Create video part
+        video_part = self._create_video_part(video_path)
+        
+        log.info(f"Using prompt: {prompt[:100]}...")
         
         # Generate content with retry mechanism
         def _generate_content():
             return self.model.generate_content([video_part, prompt])
         
         response = self._retry_with_backoff(_generate_content)
+        self._write_cache(cache_path, response.text)
+        if self.gcs_bucket and self.delete_uploads:
+            self._delete_from_gcs(video_path)
         return response.text
     
+    def _cache_path_for(self, video_path: str, prompt: str) -> str:
+        """Cache file for this chunk, prompt and model (see analysis_cache.cache_path_for)."""
+        return analysis_cache.cache_path_for(self.model_name, video_path, prompt)
+    
+    def _write_cache(self, cache_path: str, text: str) -> None:
+        """Atomically store analysis text so readers never see a partial file."""
+        analysis_cache.store(cache_path, text)
+    
+    def analyze_video_chunks_offline(self, items: List[Tuple[str, Dict]], poll_interval: float = 30.0) -> List[str]:
+        """
+        Analyze video chunks with a Vertex AI batch prediction job instead of online requests.
+        
+        Chunks are uploaded to GEMINI_UPLOAD_BUCKET, one request per chunk is written to a
+        JSONL file in the same bucket and the job is polled until it finishes. Batch jobs are
+        billed at a discount but may take much longer than online calls. Chunks already in the
+        local cache are not resubmitted; chunks without a usable batch result are re-analyzed
+        online.
+        
+        Args:
+            items: List of (video_path, chunk_info) tuples
+            poll_interval: Seconds between job state checks
+            
+        Returns:
+            Analysis texts in the same order as items
+        """
+        if not self.gcs_bucket:
+            raise ValueError("Batch mode requires GEMINI_UPLOAD_BUCKET to be set")
+        
+        results: List = [None] * len(items)
+        prompts = [self._generate_chunk_prompt(chunk_info) for _, chunk_info in items]
+        lines = []
+        for i, ((video_path, _), prompt) in enumerate(zip(items, prompts)):
+            results[i] = analysis_cache.load(self._cache_path_for(video_path, prompt))
+            if results[i] is not None:
+                continue
+            lines.append(json.dumps({
+                "request": {
+                    "contents": [{
+                        "role": "user",
+                        "parts": [
+                            {"fileData": {"fileUri": self._upload_to_gcs(video_path), "mimeType": _guess_mime_type(video_path)}},
+                            {"text": prompt},
+                        ],
+                    }],
+                    # Labels are echoed back in the output and route each response to its chunk
+                    "labels": {"request_id": f"chunk-{i}"},
+                }
+            }, ensure_ascii=False))
+        
+        if lines:
+            log.info(f"Submitting batch prediction job for {len(lines)} chunk(s)...")
+            for request_id, text in self._run_batch_job(lines, poll_interval).items():
+                i = int(request_id.split("-", 1)[1])
+                if 0 <= i < len(items) and results[i] is None:
+                    results[i] = text
+                    self._write_cache(self._cache_path_for(items[i][0], prompts[i]), text)
+        
+        for i, (video_path, chunk_info) in enumerate(items):
+            if results[i] is None:
+                log.warning(f"No batch result for {os.path.basename(video_path)}, analyzing online")
+                results[i] = self.analyze_video_chunk(video_path, chunk_info)
+        
+        if self.delete_uploads:
+            for video_path, _ in items:
+                self._delete_from_gcs(video_path)
+        return results
+    
+    def _run_batch_job(self, lines: List[str], poll_interval: float) -> Dict[str, str]:
+        """
+        Upload JSONL requests, run a batch prediction job and collect its responses.
+        
+        Args:
+            lines: JSONL request lines
+            poll_interval: Seconds between job state checks
+            
+        Returns:
+            Dictionary mapping request_id label to response text
+        """
+        from vertexai.batch_prediction import BatchPredictionJob
+        
+        bucket = _get_storage_client(self.project_id).bucket(self.gcs_bucket)
+        run_prefix = f"batch_jobs/{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        bucket.blob(f"{run_prefix}/requests.jsonl").upload_from_string(
+            "\n".join(lines), content_type="application/jsonl"
+        )
+        
+        job = BatchPredictionJob.submit(
+            source_model=self.model_name,
+            input_dataset=f"gs://{self.gcs_bucket}/{run_prefix}/requests.jsonl",
+            output_uri_prefix=f"gs://{self.gcs_bucket}/{run_prefix}/output",
+        )
+        log.info(f"Batch job created: {job.resource_name}")
+        while not job.has_ended:
+            time.sleep(poll_interval)
+            job.refresh()
+            log.info(f"Batch job state: {job.state.name}")
+        
+        if not job.has_succeeded:
+            log.error(f"Batch job failed: {job.error}")
+            return {}
+        
+        responses: Dict[str, str] = {}
+        output_prefix = job.output_location.split(f"gs://{self.gcs_bucket}/", 1)[1]
+        for blob in bucket.list_blobs(prefix=output_prefix):
+            if not blob.name.endswith(".jsonl"):
+                continue
+            for line in blob.download_as_text().splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                request_id = record.get("request", {}).get("labels", {}).get("request_id")
+                candidates = record.get("response", {}).get("candidates") or []
+                if not request_id or not candidates:
+                    continue
+                parts = candidates[0].get("content", {}).get("parts", [])
+                text = "".join(part.get("text", "") for part in parts)
+                if text:
+                    responses[request_id] = text
+        return responses
+    
     def combine_analyses(self, analyses: List[str], original_video_path: str) -> str:
         """
         Combine multiple chunk analyses into a single comprehensive analysis.
@@ -218,12 +476,12 @@ class GeminiAnalyzer:
         Returns:
             Combined analysis text
         """
-        print("Combining all chunk analyses into unified description...")
+        log.info("Combining all chunk analyses into unified description...")
         
         # Prepare chunk analyses text
-        chunk_analyses_text = ""
-        for i, analysis in enumerate(analyses, 1):
-            chunk_analyses_text += f"=== ЧАСТЬ {i} ===\n{analysis}\n\n"
+        chunk_analyses_text = "".join(
+            f"=== ЧАСТЬ {i} ===\n{analysis}\n\n" for i, analysis in enumerate(analyses, 1)
+        )
         
         # Format the prompt with chunk analyses
         combination_prompt = self._format_prompt(
@@ -238,6 +496,18 @@ class GeminiAnalyzer:
         response = self._retry_with_backoff(_generate_combined_content)
         return response.text
     
+    @functools.cached_property
+    def _single_video_prompt(self) -> str:
+        """XML prompt template formatted for a single video (chunk 1 of 1), built once per instance."""
+        return self._format_prompt(
+            self.chunk_prompt_template,
+            chunk_number=1,
+            total_chunks=1,
+            start_time_minutes="0.0",
+            end_time_minutes="0.0",
+            duration_minutes="0.0"
+        )
+    
     def analyze_single_video(self, video_path: str) -> str:
         """
         Analyze a single video file (when no chunking is needed).
@@ -248,20 +518,13 @@ class GeminiAnalyzer:
         Returns:
             Analysis text from Gemini
         """
-        print(f"Analyzing single video: {os.path.basename(video_path)}")
+        log.info(f"Analyzing single video: {os.path.basename(video_path)}")
         
         # Create video part
         video_part = self._create_video_part(video_path)
         
         # Use XML prompt template for single video (chunk 1 of 1)
-        prompt = self._format_prompt(
-            self.chunk_prompt_template,
-            chunk_number=1,
-            total_chunks=1,
-            start_time_minutes="0.0",
-            end_time_minutes="0.0",
-            duration_minutes="0.0"
-        )
+        prompt = self._single_video_prompt
         
         # Generate content with retry mechanism
         def _generate_single_content():
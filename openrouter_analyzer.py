@@ -1,21 +1,146 @@
 # OpenRouter API analyzer for video content analysis
 
+import functools
+import importlib.util
+import logging
 import os
+import re
 import time
 import random
+import asyncio
+import threading
 import base64
+import contextlib
 import mimetypes
 import httpx
-from typing import Dict, List
-from dotenv import load_dotenv
-from openai import OpenAI
+from string import Template
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI, APIStatusError, RateLimitError
+from rate_limiter import AsyncRateLimiter
+import _config
+import analysis_cache
 
-# Load environment variables
-load_dotenv("config.env")
+log = logging.getLogger(__name__)
+
+# Read size for streaming base64 encoding; a multiple of 3 so encoded blocks need no padding
+_BASE64_BLOCK_SIZE = 3 * 1024 * 1024
+
+# Matches {key} placeholders in XML prompt templates
+_PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+_OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Extended timeout for long video processing (up to 60 min videos)
+_HTTP_TIMEOUT = httpx.Timeout(
+    timeout=1800.0,    # 30 min total timeout
+    connect=60.0,      # 60 sec connect timeout
+    read=1800.0,       # 30 min read timeout (waiting for response)
+    write=300.0,       # 5 min write timeout (uploading video)
+)
+
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_http_client() -> httpx.Client:
+    """Process-wide sync connection pool, so TCP/TLS setup is paid once."""
+    return httpx.Client(timeout=_HTTP_TIMEOUT, http2=_HTTP2_AVAILABLE)
+
+
+# Process-wide cap on in-flight async requests, shared by all analyzer instances, threads and event loops
+_request_slots = threading.BoundedSemaphore(_config.load()["OPENROUTER_CONCURRENCY"])
+# Process-wide requests-per-minute budget; waited on with asyncio.sleep so no event loop is blocked
+_request_rate = AsyncRateLimiter(_config.load()["OPENROUTER_RPM"], 60)
+
+# How often a coroutine re-checks for a free request slot
+_SLOT_POLL_INTERVAL = 0.05
+
+
+@contextlib.asynccontextmanager
+async def _request_slot() -> AsyncIterator[None]:
+    """Hold one process-wide request slot, polling with asyncio.sleep rather than blocking the loop."""
+    while not _request_slots.acquire(blocking=False):
+        await asyncio.sleep(_SLOT_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        _request_slots.release()
+
+
+def _require_content(text: Optional[str], what: str) -> str:
+    """Return a completion's text, raising if the model sent back nothing for `what`."""
+    if not text:
+        raise RuntimeError(f"OpenRouter returned an empty response for {what}")
+    return text
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Check for HTTP 429 by exception type/status code rather than by message text."""
+    if isinstance(error, RateLimitError):
+        return True
+    if isinstance(error, (APIStatusError, httpx.HTTPStatusError)):
+        return getattr(error, "status_code", None) == 429 or getattr(error.response, "status_code", None) == 429
+    return False
+
+
+def _rate_limit_delay(error: Exception, attempt: int) -> float:
+    """Backoff delay for a rate-limit error: Retry-After header if present, else exponential with jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass  # HTTP-date form; fall back to exponential backoff
+    return 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+class _LoopState:
+    """Async connection pool bound to one event loop (it can't be shared across loops)."""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        # Public async calls currently running on this loop (see OpenRouterAnalyzer._loop_session)
+        self.users = 0
+
+    @functools.cached_property
+    def client(self) -> AsyncOpenAI:
+        """AsyncOpenAI client on a connection pool with limits raised for concurrent chunk analysis."""
+        self._http_client = httpx.AsyncClient(
+            timeout=_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+            http2=_HTTP2_AVAILABLE,
+        )
+        return AsyncOpenAI(
+            base_url=_OPENROUTER_BASE_URL,
+            api_key=self.api_key,
+            timeout=_HTTP_TIMEOUT,
+            http_client=self._http_client,
+        )
+
+    async def aclose(self) -> None:
+        """Close the connection pool if it was opened."""
+        if self.__dict__.pop("client", None) is not None:
+            await self._http_client.aclose()
+
+
+@functools.lru_cache(maxsize=32)
+def _read_prompt_file(path: str) -> str:
+    """Read a prompt file once per process; later calls are served from memory."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 
 class OpenRouterAnalyzer:
-    """Handles video analysis using OpenRouter API."""
+    """Handles video analysis using OpenRouter API.
+
+    The sync HTTP connection pool is shared process-wide; construct the analyzer once per
+    process. Async connection pools belong to the event loop that opened them and are closed
+    when analyze_chunks / analyze_and_combine return; call aclose() after using
+    analyze_video_chunk_async directly.
+    """
 
     def __init__(
         self,
@@ -33,31 +158,26 @@ class OpenRouterAnalyzer:
             prompt_type: One of [general, lecture, meeting, presentation, tutorial, marketing, language_lesson, interview]
             require_json_keyframes: When True, ask model to ensure KeyFrames are emitted as JSON
         """
-        self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
-        self.model_name = model_name or os.getenv("OPENROUTER_MODEL_NAME", "google/gemini-3-pro-preview")
+        # Use configuration values as defaults
+        config = _config.load()
+        self.api_key = api_key or config["OPENROUTER_API_KEY"]
+        self.model_name = model_name or config["OPENROUTER_MODEL_NAME"]
 
         if not self.api_key:
             raise ValueError("OpenRouter API key must be provided via OPENROUTER_API_KEY env variable or parameter")
 
-        # Initialize OpenAI client with OpenRouter base URL
-        # Extended timeout for long video processing (up to 60 min videos)
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.api_key,
-            timeout=httpx.Timeout(
-                timeout=1800.0,    # 30 min total timeout
-                connect=60.0,      # 60 sec connect timeout
-                read=1800.0,       # 30 min read timeout (waiting for response)
-                write=300.0,       # 5 min write timeout (uploading video)
-            ),
-        )
+        # OpenAI clients are created lazily (see client / async_client)
+
+        # The async pool is created per running event loop, so the same analyzer works across several
+        # asyncio.run() calls and in several threads at once; request limits are process-wide
+        self._loop_states: Dict[asyncio.AbstractEventLoop, _LoopState] = {}
 
         # Prompt selection
-        self.prompt_type = (prompt_type or os.getenv("PROMPT_TYPE", "general")).strip().lower()
+        self.prompt_type = (prompt_type or config["PROMPT_TYPE"]).strip().lower()
         self.require_json_keyframes = (
             require_json_keyframes
             if require_json_keyframes is not None
-            else os.getenv("REQUIRE_JSON_KEYFRAMES", "false").strip().lower() in ("1", "true", "yes")
+            else config["REQUIRE_JSON_KEYFRAMES"]
         )
 
         # Load prompts from XML files
@@ -78,7 +198,16 @@ class OpenRouterAnalyzer:
         self.chunk_prompt_template = self._load_xml_prompt(selected_prompt_file)
         self.combine_prompt_template = self._load_xml_prompt("combine_analysis_prompt.xml")
 
-    def _load_xml_prompt(self, filename: str) -> str:
+        # Shared XML postfix with JSON KeyFrames instructions, resolved once per instance
+        self._postfix = ""
+        if self.require_json_keyframes:
+            postfix_path = os.path.join(self.prompts_dir, "common_keyframes_postfix.xml")
+            if os.path.exists(postfix_path):
+                self._postfix = "\n\n" + _read_prompt_file(postfix_path).strip()
+            else:
+                log.warning("Warning: common_keyframes_postfix.xml not found; proceeding without JSON KeyFrames postfix")
+
+    def _load_xml_prompt(self, filename: str) -> Template:
         """
         Load XML prompt template from file.
 
@@ -86,30 +215,28 @@ class OpenRouterAnalyzer:
             filename: Name of the XML prompt file
 
         Returns:
-            Raw XML content as string
+            string.Template with {key} placeholders converted to ${key}
         """
         prompt_path = os.path.join(self.prompts_dir, filename)
         if not os.path.exists(prompt_path):
             raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
 
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        # Escape literal '$' first so only our placeholders are substituted
+        text = _read_prompt_file(prompt_path).replace("$", "$$")
+        return Template(_PLACEHOLDER_RE.sub(r"${\1}", text))
 
-    def _format_prompt(self, template: str, **params) -> str:
+    def _format_prompt(self, template: Template, **params) -> str:
         """
-        Format XML prompt template with parameters.
+        Format XML prompt template with parameters in a single pass.
 
         Args:
-            template: XML template string
+            template: Prompt template loaded by _load_xml_prompt
             **params: Parameters to substitute in template
 
         Returns:
             Formatted prompt string
         """
-        formatted = template
-        for key, value in params.items():
-            formatted = formatted.replace(f"{{{key}}}", str(value))
-        return formatted
+        return template.safe_substitute(params)
 
     def _retry_with_backoff(self, func, *args, max_retries: int = 5, **kwargs):
         """
@@ -127,41 +254,67 @@ class OpenRouterAnalyzer:
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                error_str = str(e).lower()
-                is_rate_limit = "rate" in error_str or "429" in error_str
-
                 if attempt == max_retries:
-                    print(f"Max retries exceeded ({max_retries})")
+                    log.error(f"Max retries exceeded ({max_retries})")
                     raise e
 
-                if is_rate_limit:
-                    base_delay = 2 ** attempt
-                    jitter = random.uniform(0.5, 1.5)
-                    delay = base_delay * jitter
-                    print(f"Rate limit hit. Waiting {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries})")
+                if _is_rate_limit_error(e):
+                    delay = _rate_limit_delay(e, attempt)
+                    log.warning(f"Rate limit hit. Waiting {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries})")
                     time.sleep(delay)
                 else:
                     raise e
 
-    def _encode_video_to_base64(self, video_path: str) -> tuple[str, str]:
+    async def _retry_with_backoff_async(self, func, *args, max_retries: int = 5, **kwargs):
+        """
+        Async variant of _retry_with_backoff: awaits func and sleeps without blocking the event loop.
+
+        Args:
+            func: Coroutine function to execute
+            max_retries: Maximum number of retry attempts
+            *args, **kwargs: Arguments to pass to the function
+
+        Returns:
+            Function result
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt == max_retries:
+                    log.error(f"Max retries exceeded ({max_retries})")
+                    raise e
+
+                if _is_rate_limit_error(e):
+                    delay = _rate_limit_delay(e, attempt)
+                    log.warning(f"Rate limit hit. Waiting {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(delay)
+                else:
+                    raise e
+
+    def _encode_video_to_data_url(self, video_path: str) -> str:
         """
-        Encode video file to base64.
+        Encode video file into a base64 data: URL.
+
+        The file is streamed in blocks (a multiple of 3 bytes, so encoded blocks
+        concatenate cleanly) instead of holding the raw bytes and the encoded copy
+        in memory at the same time.
 
         Args:
             video_path: Path to the video file
 
         Returns:
-            Tuple of (base64_data, mime_type)
+            data:<mime>;base64,<payload> string
         """
         mime_type = mimetypes.guess_type(video_path)[0]
         if not mime_type:
             mime_type = "video/mp4"
 
+        parts = [f"data:{mime_type};base64,"]
         with open(video_path, "rb") as video_file:
-            video_data = video_file.read()
-
-        base64_data = base64.b64encode(video_data).decode("utf-8")
-        return base64_data, mime_type
+            for block in iter(lambda: video_file.read(_BASE64_BLOCK_SIZE), b""):
+                parts.append(base64.b64encode(block).decode("ascii"))
+        return "".join(parts)
 
     def _generate_chunk_prompt(self, chunk_info: Dict) -> str:
         """
@@ -181,14 +334,7 @@ class OpenRouterAnalyzer:
             end_time_minutes=f"{chunk_info.get('end_time_minutes', chunk_info['duration']/60):.1f}",
             duration_minutes=f"{chunk_info['duration']/60:.1f}"
         )
-        if self.require_json_keyframes:
-            postfix_path = os.path.join(self.prompts_dir, "common_keyframes_postfix.xml")
-            if os.path.exists(postfix_path):
-                with open(postfix_path, "r", encoding="utf-8") as pf:
-                    base_prompt += "\n\n" + pf.read().strip()
-            else:
-                print("Warning: common_keyframes_postfix.xml not found; proceeding without JSON KeyFrames postfix")
-        return base_prompt
+        return base_prompt + self._postfix
 
     def analyze_video_chunk(self, video_path: str, chunk_info: Dict) -> str:
         """
@@ -201,21 +347,63 @@ class OpenRouterAnalyzer:
         Returns:
             Analysis text from OpenRouter
         """
-        print(f"Analyzing chunk {chunk_info['index']+1}/{chunk_info['total_chunks']}: {os.path.basename(video_path)}")
+        log.info(f"Analyzing chunk {chunk_info['index']+1}/{chunk_info['total_chunks']}: {os.path.basename(video_path)}")
+
+        cache_path, cached = self._lookup_cached_analysis(video_path, chunk_info)
+        if cached is not None:
+            return cached
+
+        messages = self._build_chunk_messages(video_path, chunk_info)
+
+        def _generate_content():
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+            )
+            return response.choices[0].message.content
+
+        text = _require_content(self._retry_with_backoff(_generate_content), f"chunk {chunk_info['index']+1}")
+        analysis_cache.store(cache_path, text)
+        return text
+
+    def _lookup_cached_analysis(self, video_path: str, chunk_info: Dict) -> Tuple[str, Optional[str]]:
+        """
+        Find a previous analysis of the same chunk bytes with the same prompt and model.
+
+        Args:
+            video_path: Path to the video chunk
+            chunk_info: Dictionary with chunk information
+
+        Returns:
+            Tuple of (cache file path, cached text or None)
+        """
+        cache_path = analysis_cache.cache_path_for(self.model_name, video_path, self._generate_chunk_prompt(chunk_info))
+        cached = analysis_cache.load(cache_path)
+        if cached is not None:
+            log.info(f"Using cached analysis: {os.path.basename(cache_path)}")
+        return cache_path, cached
+
+    def _build_chunk_messages(self, video_path: str, chunk_info: Dict) -> List[Dict]:
+        """
+        Build chat messages with prompt and base64 video content for a chunk.
+
+        Args:
+            video_path: Path to the video chunk
+            chunk_info: Dictionary with chunk information
 
-        # Encode video to base64
-        base64_data, mime_type = self._encode_video_to_base64(video_path)
+        Returns:
+            Messages list for chat.completions.create
+        """
+        # Encode video to base64 data URL
+        data_url = self._encode_video_to_data_url(video_path)
 
         # Generate appropriate prompt
         prompt = self._generate_chunk_prompt(chunk_info)
 
-        print(f"Using prompt: {prompt[:100]}...")
-        print(f"Using model: {self.model_name}")
+        log.info(f"Using prompt: {prompt[:100]}...")
+        log.info(f"Using model: {self.model_name}")
 
-        # Build message with video content
-        data_url = f"data:{mime_type};base64,{base64_data}"
-
-        messages = [
+        return [
             {
                 "role": "user",
                 "content": [
@@ -231,14 +419,102 @@ class OpenRouterAnalyzer:
             }
         ]
 
-        def _generate_content():
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
+    def _loop_state(self) -> _LoopState:
+        """Return the async state for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        # Each thread only touches the entry of its own loop, so no lock is needed
+        state = self._loop_states.get(loop)
+        if state is None:
+            state = self._loop_states[loop] = _LoopState(self.api_key)
+        return state
+
+    @contextlib.asynccontextmanager
+    async def _loop_session(self) -> AsyncIterator[_LoopState]:
+        """Hold the running loop's state for a public async call; close it when the last one ends."""
+        loop = asyncio.get_running_loop()
+        state = self._loop_state()
+        state.users += 1
+        try:
+            yield state
+        finally:
+            state.users -= 1
+            if not state.users and self._loop_states.get(loop) is state:
+                del self._loop_states[loop]
+                await state.aclose()
+
+    async def analyze_video_chunk_async(self, video_path: str, chunk_info: Dict) -> str:
+        """
+        Analyze a single video chunk without blocking the event loop.
+
+        Args:
+            video_path: Path to the video chunk
+            chunk_info: Dictionary with chunk information
+
+        Returns:
+            Analysis text from OpenRouter
+        """
+        async with _request_slot():
+            log.info(f"Analyzing chunk {chunk_info['index']+1}/{chunk_info['total_chunks']}: {os.path.basename(video_path)}")
+
+            # Hashing the chunk for the cache key reads the whole file; keep it off the event loop
+            cache_path, cached = await asyncio.to_thread(self._lookup_cached_analysis, video_path, chunk_info)
+            if cached is not None:
+                return cached
+
+            # Reading and encoding the file is blocking; keep it off the event loop
+            messages = await asyncio.to_thread(self._build_chunk_messages, video_path, chunk_info)
+
+            async def _generate_content():
+                await _request_rate.acquire()
+                response = await self.async_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                )
+                return response.choices[0].message.content
+
+            text = _require_content(
+                await self._retry_with_backoff_async(_generate_content), f"chunk {chunk_info['index']+1}"
             )
-            return response.choices[0].message.content
+            await asyncio.to_thread(analysis_cache.store, cache_path, text)
+            return text
+
+    @functools.cached_property
+    def client(self) -> OpenAI:
+        """Sync OpenAI client for OpenRouter on the shared connection pool."""
+        return OpenAI(
+            base_url=_OPENROUTER_BASE_URL,
+            api_key=self.api_key,
+            timeout=_HTTP_TIMEOUT,
+            http_client=_shared_http_client(),
+        )
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async OpenAI client for OpenRouter on the running event loop's connection pool."""
+        return self._loop_state().client
+
+    async def aclose(self) -> None:
+        """Close the running event loop's async connection pool (call before the loop shuts down)."""
+        state = self._loop_states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.aclose()
 
-        return self._retry_with_backoff(_generate_content)
+    async def analyze_chunks(self, jobs: List[Tuple[str, Dict]]) -> List[str]:
+        """
+        Analyze all chunks concurrently (bounded by OPENROUTER_CONCURRENCY).
+
+        Usage: analyses = asyncio.run(analyzer.analyze_chunks(jobs))
+
+        Args:
+            jobs: List of (video_path, chunk_info) tuples
+
+        Returns:
+            Analysis texts in the same order as jobs
+        """
+        async with self._loop_session():
+            return list(await asyncio.gather(
+                *(self.analyze_video_chunk_async(path, chunk_info) for path, chunk_info in jobs)
+            ))
 
     def combine_analyses(self, analyses: List[str], original_video_path: str) -> str:
         """
@@ -251,34 +527,153 @@ class OpenRouterAnalyzer:
         Returns:
             Combined analysis text
         """
-        print("Combining all chunk analyses into unified description...")
+        log.info("Combining all chunk analyses into unified description...")
 
         # Prepare chunk analyses text
-        chunk_analyses_text = ""
-        for i, analysis in enumerate(analyses, 1):
-            chunk_analyses_text += f"=== PART {i} ===\n{analysis}\n\n"
+        chunk_analyses_text = "".join(
+            self._format_part(i, analysis) for i, analysis in enumerate(analyses, 1)
+        )
+        messages = self._build_combine_messages(chunk_analyses_text)
+
+        def _generate_combined_content():
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+            )
+            return response.choices[0].message.content
+
+        return _require_content(self._retry_with_backoff(_generate_combined_content), "the combined analysis")
+
+    @staticmethod
+    def _format_part(number: int, analysis: str) -> str:
+        """Format one chunk analysis as a section of the combine prompt."""
+        return f"=== PART {number} ===\n{analysis}\n\n"
+
+    def _build_combine_messages(self, chunk_analyses_text: str) -> List[Dict]:
+        """
+        Build chat messages for the combine request.
+
+        Args:
+            chunk_analyses_text: Concatenated per-part analyses
 
+        Returns:
+            Messages list for chat.completions.create
+        """
         # Format the prompt with chunk analyses
         combination_prompt = self._format_prompt(
             self.combine_prompt_template,
             chunk_analyses=chunk_analyses_text
         )
 
-        messages = [
+        return [
             {
                 "role": "user",
                 "content": combination_prompt
             }
         ]
 
-        def _generate_combined_content():
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
+    async def stream_analyses(self, jobs: List[Tuple[str, Dict]]) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Analyze chunks concurrently and yield results as soon as each one finishes.
+
+        Args:
+            jobs: List of (video_path, chunk_info) tuples
+
+        Yields:
+            (index into jobs, analysis text) in completion order
+        """
+        async def _indexed(index: int, video_path: str, chunk_info: Dict) -> Tuple[int, str]:
+            return index, await self.analyze_video_chunk_async(video_path, chunk_info)
+
+        tasks = [
+            asyncio.ensure_future(_indexed(i, video_path, chunk_info))
+            for i, (video_path, chunk_info) in enumerate(jobs)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early or a chunk failed: don't leave requests running
+            for task in tasks:
+                task.cancel()
+
+    async def analyze_and_combine(
+        self,
+        jobs: List[Tuple[str, Dict]],
+        on_analysis: Optional[Callable[[int, str], Awaitable[Any]]] = None,
+    ) -> Tuple[List[str], str]:
+        """
+        Analyze chunks concurrently and combine them, overlapping the two stages.
+
+        The combine input is assembled incrementally while chunks are still in flight,
+        so the combine request is sent as soon as the last chunk arrives.
+
+        Usage: analyses, final = asyncio.run(analyzer.analyze_and_combine(jobs))
+
+        Args:
+            jobs: List of (video_path, chunk_info) tuples
+            on_analysis: Optional coroutine function called with (job index, analysis text) for
+                each chunk in job order; calls run alongside the remaining requests and are
+                awaited before returning
+
+        Returns:
+            Tuple of (per-chunk analyses in job order, combined analysis)
+        """
+        async with self._loop_session():
+            analyses: List[Optional[str]] = [None] * len(jobs)
+            parts: List[str] = []
+            callbacks = []
+            async for index, text in self._ordered_prefix(self.stream_analyses(jobs), analyses):
+                parts.append(self._format_part(index + 1, text))
+                if on_analysis is not None:
+                    callbacks.append(asyncio.ensure_future(on_analysis(index, text)))
+            if len(parts) != len(jobs):
+                # Never combine (or let the caller save) a partial set of chunks
+                await asyncio.gather(*callbacks, return_exceptions=True)
+                raise RuntimeError(f"Only {len(parts)} of {len(jobs)} chunk analyses arrived")
+
+            if len(analyses) <= 1:
+                # Single chunk - use as is
+                await asyncio.gather(*callbacks)
+                return analyses, analyses[0] if analyses else ""
+
+            log.info("Combining all chunk analyses into unified description...")
+            messages = self._build_combine_messages("".join(parts))
+
+            async def _generate_combined_content():
+                await _request_rate.acquire()
+                response = await self.async_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                )
+                return response.choices[0].message.content
+
+            combined = _require_content(
+                await self._retry_with_backoff_async(_generate_combined_content), "the combined analysis"
             )
-            return response.choices[0].message.content
+            await asyncio.gather(*callbacks)
+            return analyses, combined
 
-        return self._retry_with_backoff(_generate_combined_content)
+    @staticmethod
+    async def _ordered_prefix(
+        results: AsyncIterator[Tuple[int, str]], slots: List[Optional[str]]
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Re-order completion-order results, yielding each one once all earlier ones have arrived.
+
+        Args:
+            results: (index, text) pairs in completion order
+            slots: Preallocated list filled in place by index
+        """
+        # Track arrivals separately so a falsy text can't be mistaken for "still pending"
+        arrived = set()
+        next_index = 0
+        async for index, text in results:
+            slots[index] = text
+            arrived.add(index)
+            while next_index in arrived:
+                yield next_index, slots[next_index]
+                next_index += 1
 
     def analyze_single_video(self, video_path: str) -> str:
         """
@@ -290,10 +685,10 @@ class OpenRouterAnalyzer:
         Returns:
             Analysis text from OpenRouter
         """
-        print(f"Analyzing single video: {os.path.basename(video_path)}")
+        log.info(f"Analyzing single video: {os.path.basename(video_path)}")
 
-        # Encode video to base64
-        base64_data, mime_type = self._encode_video_to_base64(video_path)
+        # Encode video to base64 data URL
+        data_url = self._encode_video_to_data_url(video_path)
 
         # Use XML prompt template for single video (chunk 1 of 1)
         prompt = self._format_prompt(
@@ -305,8 +700,6 @@ class OpenRouterAnalyzer:
             duration_minutes="0.0"
         )
 
-        data_url = f"data:{mime_type};base64,{base64_data}"
-
         messages = [
             {
                 "role": "user",
@@ -330,4 +723,4 @@ class OpenRouterAnalyzer:
             )
             return response.choices[0].message.content
 
-        return self._retry_with_backoff(_generate_single_content)
+        return _require_content(self._retry_with_backoff(_generate_single_content), "the video")
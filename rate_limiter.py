@@ -0,0 +1,87 @@
+# Client-side rate limiting for API calls
+
+import asyncio
+import threading
+import time
+
+
+class _TokenBucket:
+    """Token bucket state shared by the sync and asyncio limiters."""
+
+    def __init__(self, rate: float, per: float = 60.0):
+        """
+        Initialize rate limiter.
+
+        Args:
+            rate: Number of acquisitions allowed per period (also the burst size)
+            per: Period length in seconds
+        """
+        if rate <= 0 or per <= 0:
+            raise ValueError("rate and per must be positive")
+        self.capacity = float(rate)
+        self.refill_per_sec = rate / per
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_sec)
+        self._updated = now
+
+    def _try_take(self, amount: float) -> float:
+        """Take `amount` tokens if available; otherwise return seconds to wait before retrying."""
+        if amount > self.capacity:
+            raise ValueError("Cannot acquire more than the bucket capacity")
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0.0
+        return (amount - self._tokens) / self.refill_per_sec
+
+
+class RateLimiter(_TokenBucket):
+    """Thread-safe token bucket allowing `rate` acquisitions per `per` seconds."""
+
+    def __init__(self, rate: float, per: float = 60.0):
+        super().__init__(rate, per)
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """
+        Block until `amount` tokens are available and take them.
+
+        Args:
+            amount: Number of tokens to consume
+        """
+        while True:
+            with self._lock:
+                wait = self._try_take(amount)
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class AsyncRateLimiter(_TokenBucket):
+    """Thread-safe token bucket allowing `rate` acquisitions per `per` seconds, awaited from asyncio code.
+
+    One instance can be shared by event loops running in different threads; waiting never blocks a loop.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0):
+        super().__init__(rate, per)
+        self._lock = threading.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """
+        Wait until `amount` tokens are available and take them.
+
+        Args:
+            amount: Number of tokens to consume
+        """
+        while True:
+            # Held only for the check-and-take, never across an await
+            with self._lock:
+                wait = self._try_take(amount)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
@@ -1,12 +1,34 @@
 # Result combination utilities for video analysis
 
+import functools
+import logging
 import os
 import re
+import asyncio
 import json
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Optional, Dict, Any
 from file_utils import save_analysis_to_file, ensure_directory_exists
 
+log = logging.getLogger(__name__)
+
+try:
+    import orjson  # Optional: faster JSON encode/decode for key frames
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Patterns used by ResultCombiner.extract_key_frames_json
+_FENCE_JSON_RE = re.compile(r"```json\s*([\s\S]*?)\s*```", re.IGNORECASE)
+_FENCE_ANY_RE = re.compile(r"```\s*([\s\S]*?)\s*```", re.IGNORECASE)
+_JSON_OBJ_RE = re.compile(r"\{[\s\S]*?\}")
+# Line that separates the metadata header from the analysis text in chunk analysis files
+_METADATA_END = f"{'='*50}\n\n"
+# Range separators in timecodes like "00:01:00-00:02:00" or "01:00 to 02:00"
+_TC_SPLIT_RE = re.compile(r"\s*(?:-|–|—|→|>>| to )\s*")
+
 
 class ResultCombiner:
     """Handles combining and saving video analysis results."""
@@ -28,10 +50,9 @@ class ResultCombiner:
         Returns:
             Path to the saved analysis file
         """
-        # Generate analysis filename
         chunk_filename = os.path.basename(chunk_path)
-        analysis_filename = os.path.splitext(chunk_filename)[0] + "_analysis.txt"
-        analysis_path = os.path.join(temp_dir, analysis_filename)
+        analysis_path = self.analysis_path_for(chunk_path, temp_dir)
+        analysis_filename = os.path.basename(analysis_path)
         
         # Add metadata to analysis
         metadata = (
@@ -39,18 +60,48 @@ class ResultCombiner:
             f"Time range: {chunk_info['start_time_minutes']:.1f}-{chunk_info['end_time_minutes']:.1f} minutes\n"
             f"Duration: {chunk_info['duration']/60:.1f} minutes\n"
             f"Source file: {chunk_filename}\n"
-            f"{'='*50}\n\n"
+            f"{_METADATA_END}"
         )
         
-        full_content = metadata + analysis_text
+        # Write encoded parts directly instead of building a concatenated string
+        with open(analysis_path, "wb", buffering=1024 * 1024) as f:
+            f.write(metadata.encode("utf-8"))
+            f.write(analysis_text.encode("utf-8"))
         
-        # Save to file
-        with open(analysis_path, "w", encoding="utf-8") as f:
-            f.write(full_content)
-        
-        print(f"Saved chunk analysis to: {analysis_filename}")
+        log.info(f"Saved chunk analysis to: {analysis_filename}")
         return analysis_path
     
+    @staticmethod
+    def analysis_path_for(chunk_path: str, temp_dir: str) -> str:
+        """
+        Path of the analysis file save_chunk_analysis writes for a chunk.
+        
+        Args:
+            chunk_path: Path to the video chunk
+            temp_dir: Temporary directory path
+            
+        Returns:
+            Path to the chunk analysis file
+        """
+        chunk_filename = os.path.basename(chunk_path)
+        return os.path.join(temp_dir, os.path.splitext(chunk_filename)[0] + "_analysis.txt")
+    
+    async def save_chunk_analysis_async(self, analysis_text: str, chunk_path: str, chunk_info: dict, temp_dir: str) -> str:
+        """
+        Async variant of save_chunk_analysis; the file write runs in a worker thread
+        so it does not block the event loop while other chunk requests are in flight.
+        
+        Args:
+            analysis_text: Analysis text from the analyzer
+            chunk_path: Path to the video chunk
+            chunk_info: Dictionary with chunk information
+            temp_dir: Temporary directory path
+            
+        Returns:
+            Path to the saved analysis file
+        """
+        return await asyncio.to_thread(self.save_chunk_analysis, analysis_text, chunk_path, chunk_info, temp_dir)
+    
     def load_chunk_analyses(self, chunk_analysis_paths: List[str]) -> List[str]:
         """
         Load all chunk analyses from files.
@@ -61,18 +112,25 @@ class ResultCombiner:
         Returns:
             List of analysis texts
         """
-        analyses = []
+        if not chunk_analysis_paths:
+            return []
         
-        for analysis_path in chunk_analysis_paths:
-            if os.path.exists(analysis_path):
-                with open(analysis_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    analyses.append(content)
-                print(f"Loaded analysis from: {os.path.basename(analysis_path)}")
-            else:
-                print(f"Warning: Analysis file not found: {analysis_path}")
+        # File reads release the GIL, so overlap them; map() keeps the original order
+        with ThreadPoolExecutor(max_workers=min(16, len(chunk_analysis_paths))) as executor:
+            contents = list(executor.map(self._read_chunk_analysis, chunk_analysis_paths))
         
-        return analyses
+        return [content for content in contents if content is not None]
+    
+    @staticmethod
+    def _read_chunk_analysis(analysis_path: str) -> Optional[str]:
+        """Read one chunk analysis file, or return None (with a warning) if it is missing."""
+        if not os.path.exists(analysis_path):
+            log.warning(f"Warning: Analysis file not found: {analysis_path}")
+            return None
+        with open(analysis_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        log.info(f"Loaded analysis from: {os.path.basename(analysis_path)}")
+        return content
     
     @staticmethod
     def extract_key_frames_json(text: str) -> Optional[Dict[str, Any]]:
@@ -80,27 +138,26 @@ class ResultCombiner:
         Try to extract a JSON object with key "key_frames" from model output text.
         Returns parsed dict or None if not found/parsable.
         """
+        # Nothing to find: skip all regex scans
+        if "key_frames" not in text:
+            return None
         # 1) Look for fenced code blocks ```json ... ``` or ``` ... ```
-        fence_patterns = [
-            r"```json\s*([\s\S]*?)\s*```",
-            r"```\s*([\s\S]*?)\s*```",
-        ]
-        for pat in fence_patterns:
-            m = re.search(pat, text, flags=re.IGNORECASE)
+        for pat in (_FENCE_JSON_RE, _FENCE_ANY_RE):
+            m = pat.search(text)
             if m:
                 candidate = m.group(1).strip()
                 try:
-                    data = json.loads(candidate)
+                    data = _json_loads(candidate)
                     if isinstance(data, dict) and "key_frames" in data:
                         return data
                 except Exception:
                     pass
         # 2) Fallback: find the first JSON-looking object containing "key_frames"
-        json_like = re.findall(r"\{[\s\S]*?\}", text)
-        for block in json_like:
+        for match in _JSON_OBJ_RE.finditer(text):
+            block = match.group(0)
             if "key_frames" in block:
                 try:
-                    data = json.loads(block)
+                    data = _json_loads(block)
                     if isinstance(data, dict) and "key_frames" in data:
                         return data
                 except Exception:
@@ -114,17 +171,20 @@ class ResultCombiner:
         """
         if not timecode:
             return "00:00:00"
-        # Split on common range separators
-        for sep in ["-", "–", "—", " to ", "→", ">>", "→ "]:
-            if sep in timecode:
-                timecode = timecode.split(sep)[0].strip()
-                break
-        return timecode.strip()
+        # Split on the first common range separator
+        return _TC_SPLIT_RE.split(timecode.strip(), maxsplit=1)[0]
 
     @staticmethod
     def timecode_to_seconds(timecode: str) -> int:
         """Convert 'hh:mm:ss' or 'mm:ss' into total seconds. Handles ranges by taking start."""
-        t = ResultCombiner._sanitize_timecode_for_ffmpeg(str(timecode))
+        # Model output may hold numbers or other JSON values; normalize before the cached parse
+        return ResultCombiner._parse_timecode(str(timecode))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _parse_timecode(timecode: str) -> int:
+        """Cached worker for timecode_to_seconds; key frames often repeat the same timecodes."""
+        t = ResultCombiner._sanitize_timecode_for_ffmpeg(timecode)
         parts = t.split(":")
         try:
             if len(parts) == 3:
@@ -139,6 +199,7 @@ class ResultCombiner:
             return 0
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def seconds_to_timecode(seconds: int) -> str:
         """Convert seconds into zero-padded 'hh:mm:ss'."""
         seconds = max(0, int(seconds))
@@ -154,6 +215,8 @@ class ResultCombiner:
         # ffmpeg -ss TIME -i INPUT -frames:v 1 -q:v 2 OUTPUT
         cmd = [
             "ffmpeg", "-y",
+            "-loglevel", "error",
+            "-nostdin",
             "-ss", timecode,
             "-i", video_path,
             "-frames:v", "1",
@@ -161,10 +224,38 @@ class ResultCombiner:
             out_path,
         ]
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return True
         except Exception as e:
-            print(f"Warning: failed to export key frame at {timecode}: {e}")
+            log.warning(f"Warning: failed to export key frame at {timecode}: {e}")
+            return False
+
+    def _export_key_frames_batch(self, video_path: str, frames: List[Tuple[str, str]]) -> bool:
+        """
+        Export several frames with a single ffmpeg process.
+
+        Each timecode becomes its own fast-seeked input (-ss before -i) mapped to one
+        output image, so N frames cost one process spawn instead of N.
+
+        Args:
+            video_path: Path to the source video
+            frames: List of (timecode, out_path) pairs
+
+        Returns:
+            True if all frames were exported
+        """
+        if not frames:
+            return True
+        cmd = ["ffmpeg", "-y", "-loglevel", "error", "-nostdin"]
+        for timecode, _ in frames:
+            cmd += ["-ss", timecode, "-i", video_path]
+        for i, (_, out_path) in enumerate(frames):
+            cmd += ["-map", f"{i}:v:0", "-frames:v", "1", "-q:v", "2", out_path]
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        except Exception as e:
+            log.warning(f"Warning: batch key frame export failed, falling back to per-frame export: {e}")
             return False
 
     def save_final_analysis(self, final_analysis: str, original_video_path: str, require_json_keyframes: bool = False, key_frames_data: Optional[Dict[str, Any]] = None) -> str:
@@ -197,22 +288,40 @@ class ResultCombiner:
                 kf_dir = os.path.join(out_dir, "key_frames")
                 ensure_directory_exists(kf_dir)
                 kf_json_path = os.path.join(kf_dir, "key_frames.json")
-                with open(kf_json_path, "w", encoding="utf-8") as jf:
-                    json.dump(key_frames_data, jf, ensure_ascii=False, indent=2)
-                print(f"Saved key frames JSON to: {kf_json_path}")
+                if orjson is not None:
+                    with open(kf_json_path, "wb") as jf:
+                        jf.write(orjson.dumps(key_frames_data, option=orjson.OPT_INDENT_2))
+                else:
+                    with open(kf_json_path, "w", encoding="utf-8") as jf:
+                        json.dump(key_frames_data, jf, ensure_ascii=False, indent=2)
+                log.info(f"Saved key frames JSON to: {kf_json_path}")
 
-                # Export images for each frame
+                # Export images for all frames in one ffmpeg run; fall back to parallel per-frame runs
+                jobs = []
                 for idx, frame in enumerate(key_frames_data["key_frames"], start=1):
                     tc = self._sanitize_timecode_for_ffmpeg(str(frame.get("timecode", "00:00:00")))
                     safe_tc = tc.replace(":", "-")
                     img_name = f"{idx:03d}_{safe_tc}.jpg"
                     img_path = os.path.join(kf_dir, img_name)
-                    self._export_key_frame_image(original_video_path, tc, img_path)
+                    jobs.append((original_video_path, tc, img_path))
+                frames = [(tc, img_path) for _, tc, img_path in jobs]
+                if jobs and not self._export_key_frames_batch(original_video_path, frames):
+                    max_workers = min(8, os.cpu_count() or 1, len(jobs))
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        list(executor.map(lambda job: self._export_key_frame_image(*job), jobs))
             else:
-                print("No parsable key_frames JSON found in the analysis output.")
+                log.warning("No parsable key_frames JSON found in the analysis output.")
 
         return final_output_path
     
+    @staticmethod
+    def _size_kb(path: str) -> Optional[float]:
+        """Return file size in KB with a single stat() call, or None if the file is missing."""
+        try:
+            return os.stat(path).st_size / 1024
+        except OSError:
+            return None
+    
     def generate_summary_report(self, chunk_analysis_paths: List[str], final_analysis_path: str, 
                               original_video_path: str, processing_time: float) -> str:
         """
@@ -240,18 +349,20 @@ class ResultCombiner:
 ПРОМЕЖУТОЧНЫЕ ФАЙЛЫ:
 """
         
-        for i, path in enumerate(chunk_analysis_paths, 1):
-            filename = os.path.basename(path)
-            size_kb = os.path.getsize(path) / 1024 if os.path.exists(path) else 0
-            report += f"  {i}. {filename} ({size_kb:.1f} KB)\n"
+        sizes = [self._size_kb(path) for path in chunk_analysis_paths]
+        report += "".join(
+            f"  {i}. {os.path.basename(path)} ({size:.1f} KB)\n" if size is not None
+            else f"  {i}. {os.path.basename(path)} (отсутствует)\n"
+            for i, (path, size) in enumerate(zip(chunk_analysis_paths, sizes), 1)
+        )
         
         report += f"""
 ИТОГОВЫЙ ФАЙЛ:
   {os.path.basename(final_analysis_path)}
 """
         
-        if os.path.exists(final_analysis_path):
-            final_size_kb = os.path.getsize(final_analysis_path) / 1024
+        final_size_kb = self._size_kb(final_analysis_path)
+        if final_size_kb is not None:
             report += f"  Размер: {final_size_kb:.1f} KB\n"
         
         return report
@@ -3,17 +3,74 @@
 # Supports both Google Gemini (via Vertex AI) and OpenRouter API
 
 import os
+import sys
 import time
-import glob
+import queue
+import asyncio
+import logging
+import argparse
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+import _config
+import analysis_cache
 from video_processor import VideoProcessor
 from analyzer_factory import create_analyzer, get_analyzer_info
 from result_combiner import ResultCombiner
-from file_utils import get_temp_directory, ensure_directory_exists
+from file_utils import get_temp_directory, ensure_directory_exists, prefetch_file
 
 # Load environment variables
 load_dotenv("config.env")
 
+log = logging.getLogger("video_analyzer")
+
+
+# Prompt types offered by ask_prompt_options (prompt files live in prompts/)
+PROMPT_TYPES = [
+    "general",
+    "lecture",
+    "meeting",
+    "presentation",
+    "tutorial",
+    "marketing",
+    "language_lesson",
+    "interview",
+    "voiceover",
+]
+
+
+def setup_logging() -> QueueListener:
+    """Route log records through a queue to a single writer thread.
+
+    Worker threads only enqueue records, so they never contend for stdout.
+
+    Returns:
+        Started listener; call stop() to flush remaining records on exit
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", datefmt="%H:%M:%S"))
+    listener = QueueListener(log_queue, stream_handler)
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    listener.start()
+    return listener
+
+
+def default_prompt_options() -> tuple[str, bool]:
+    """Prompt options from PROMPT_TYPE / REQUIRE_JSON_KEYFRAMES, used without interactive input.
+
+    Returns:
+        (prompt_type, require_json_keyframes)
+    """
+    config = _config.load()
+    default_type = config["PROMPT_TYPE"]
+    if default_type not in PROMPT_TYPES:
+        default_type = "general"
+    return default_type, config["REQUIRE_JSON_KEYFRAMES"]
+
 
 def ask_prompt_options() -> tuple[str, bool]:
     """Ask user to choose prompt type and whether to require JSON KeyFrames.
@@ -21,33 +78,18 @@ def ask_prompt_options() -> tuple[str, bool]:
     Returns:
         (prompt_type, require_json_keyframes)
     """
-    types = [
-        "general",
-        "lecture",
-        "meeting",
-        "presentation",
-        "tutorial",
-        "marketing",
-        "language_lesson",
-        "interview",
-        "voiceover",
-    ]
-
-    default_type = os.getenv("PROMPT_TYPE", "general").strip().lower()
-    if default_type not in types:
-        default_type = "general"
-    default_json = os.getenv("REQUIRE_JSON_KEYFRAMES", "false").strip().lower() in ("1", "true", "yes")
+    default_type, default_json = default_prompt_options()
 
     print("\nSelect prompt type:")
-    for idx, t in enumerate(types, 1):
+    for idx, t in enumerate(PROMPT_TYPES, 1):
         mark = " (default)" if t == default_type else ""
         print(f"  {idx}. {t}{mark}")
     choice = input("Enter number (press Enter for default): ").strip()
 
     if choice.isdigit():
         i = int(choice)
-        if 1 <= i <= len(types):
-            prompt_type = types[i - 1]
+        if 1 <= i <= len(PROMPT_TYPES):
+            prompt_type = PROMPT_TYPES[i - 1]
         else:
             prompt_type = default_type
     else:
@@ -67,6 +109,10 @@ def ask_prompt_options() -> tuple[str, bool]:
     return prompt_type, require_json_keyframes
 
 
+# Supported video extensions (lowercase, matched case-insensitively)
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v'})
+
+
 def find_video_files(video_directory: str) -> list[str]:
     """
     Find all video files in the specified directory.
@@ -77,150 +123,342 @@ def find_video_files(video_directory: str) -> list[str]:
     Returns:
         List of video file paths
     """
-    # Supported video extensions
-    video_extensions = ['*.mp4', '*.avi', '*.mov', '*.mkv', '*.wmv', '*.flv', '*.webm', '*.m4v']
-    
-    video_files = []
-    for extension in video_extensions:
-        pattern = os.path.join(video_directory, extension)
-        video_files.extend(glob.glob(pattern, recursive=False))
-        # Also check uppercase extensions
-        pattern_upper = os.path.join(video_directory, extension.upper())
-        video_files.extend(glob.glob(pattern_upper, recursive=False))
+    # One directory pass; extension check covers any letter case
+    with os.scandir(video_directory) as entries:
+        video_files = [
+            entry.path for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+        ]
     
     # Sort files for consistent processing order
     video_files.sort()
     return video_files
 
 
-def process_single_video(video_path: str, chunk_duration_minutes: int, prompt_type: str, require_json_keyframes: bool) -> bool:
+def finish_video_analysis(analyzer, combiner: ResultCombiner, video_path: str, chunk_infos: list[dict],
+                          chunk_analyses: list[str], chunk_analysis_paths: list[str],
+                          require_json_keyframes: bool, start_time: float,
+                          final_analysis: Optional[str] = None) -> None:
+    """
+    Combine per-chunk analyses of one video, save the final result and print a summary.
+    
+    Args:
+        analyzer: Analyzer used to combine chunk analyses
+        combiner: Result combiner used to save results
+        video_path: Path to the source video file
+        chunk_infos: Chunk information dictionaries in chunk order
+        chunk_analyses: Analysis texts in chunk order
+        chunk_analysis_paths: Saved chunk analysis files in chunk order
+        require_json_keyframes: Whether key frames JSON should be collected and exported
+        start_time: time.time() when processing of this video started
+        final_analysis: Combined analysis if the analyzer already produced it (skips the combine request)
+    """
+    video_name = os.path.basename(video_path)
+    collected_key_frames = []  # accumulate all key frames across chunks
+    
+    # Collect key frames (if present) in chunk order
+    if require_json_keyframes:
+        to_seconds = ResultCombiner.timecode_to_seconds
+        to_timecode = ResultCombiner.seconds_to_timecode
+        for chunk_info, analysis_text in zip(chunk_infos, chunk_analyses):
+            kf = ResultCombiner.extract_key_frames_json(analysis_text)
+            if kf and isinstance(kf.get("key_frames"), list):
+                # Adjust chunk-relative timecodes to absolute by adding chunk start offset
+                start_offset_sec = chunk_info['start_seconds']
+                collected_key_frames.extend(
+                    {
+                        "timecode": to_timecode(to_seconds(item.get("timecode", "00:00:00")) + start_offset_sec),
+                        "title": item.get("title", ""),
+                        "frame_description": item.get("frame_description", ""),
+                    }
+                    for item in kf["key_frames"]
+                )
+    
+    # Step 3: Combine analyses or use single analysis
+    log.info(f"🔗 Step 3: Creating final analysis...")
+    
+    if final_analysis is not None:
+        # Combined by the analyzer while chunk analysis was still running
+        pass
+    elif len(chunk_analyses) > 1:
+        # Multiple chunks - combine them
+        final_analysis = analyzer.combine_analyses(chunk_analyses, video_path)
+    else:
+        # Single chunk - use as is
+        final_analysis = chunk_analyses[0]
+    
+    # Step 4: Save final result
+    log.info(f"💾 Step 4: Saving final results...")
+    # Build unified key frames JSON if requested
+    kf_payload = None
+    if require_json_keyframes and collected_key_frames:
+        kf_payload = {"key_frames": collected_key_frames}
+    final_output_path = combiner.save_final_analysis(
+        final_analysis,
+        video_path,
+        require_json_keyframes=require_json_keyframes,
+        key_frames_data=kf_payload,
+    )
+    
+    # Calculate processing time
+    processing_time = time.time() - start_time
+    
+    # Generate and display summary
+    summary = combiner.generate_summary_report(
+        chunk_analysis_paths, final_output_path, video_path, processing_time
+    )
+    
+    log.info(f"✅ ANALYSIS COMPLETED SUCCESSFULLY for {video_name}!")
+    log.info(f"⏱️  Processing time: {processing_time:.1f} seconds ({processing_time/60:.1f} minutes)")
+    log.info(f"📄 Analysis saved to: {final_output_path}")
+    
+    # Show preview
+    log.info(f"📖 Preview of analysis:")
+    log.info("-" * 50)
+    preview_length = 300
+    if len(final_analysis) > preview_length:
+        log.info(final_analysis[:preview_length] + "...")
+    else:
+        log.info(final_analysis)
+
+
+async def analyze_video_chunks_async(analyzer, combiner: ResultCombiner, video_processor: VideoProcessor,
+                                     chunks: list[tuple[int, str, int]], temp_dir: str):
+    """
+    Analyze all chunks of one video concurrently and combine them on one event loop.
+    
+    Args:
+        analyzer: Analyzer with an async analyze_and_combine (OpenRouter)
+        combiner: Result combiner used to save chunk analyses
+        video_processor: Processor that produced the chunks
+        chunks: (chunk_index, chunk_path, total_chunks) tuples from iter_chunks
+        temp_dir: Temporary directory for chunk analysis files
+        
+    Returns:
+        (chunk_infos, chunk_analyses, chunk_analysis_paths, final_analysis), lists in chunk order
+    """
+    chunk_infos = [video_processor.get_chunk_info(chunk_path, i, total) for i, chunk_path, total in chunks]
+    jobs = [(chunk_path, chunk_info) for (_, chunk_path, _), chunk_info in zip(chunks, chunk_infos)]
+    chunk_analysis_paths = [None] * len(jobs)
+    
+    async def save(index: int, analysis_text: str) -> None:
+        # File write runs in a worker thread while other chunk requests stay in flight
+        chunk_path, chunk_info = jobs[index]
+        chunk_analysis_paths[index] = await combiner.save_chunk_analysis_async(
+            analysis_text, chunk_path, chunk_info, temp_dir
+        )
+    
+    chunk_analyses, final_analysis = await analyzer.analyze_and_combine(jobs, on_analysis=save)
+    return chunk_infos, chunk_analyses, chunk_analysis_paths, final_analysis
+
+
+def process_single_video(video_path: str, chunk_duration_minutes: int, require_json_keyframes: bool,
+                         analyzer, combiner: ResultCombiner,
+                         cleanup_existing: bool = False) -> bool:
     """
     Process a single video file.
     
     Args:
         video_path: Path to the video file
         chunk_duration_minutes: Duration for video chunks
+        require_json_keyframes: Whether key frames JSON should be collected and exported
+        analyzer: Analyzer shared across videos (created once in main)
+        combiner: Result combiner shared across videos
+        cleanup_existing: Whether to clear the temporary directory before splitting instead of
+            reusing chunks from an earlier run (must be False while videos are processed in parallel)
         
     Returns:
         True if processing was successful, False otherwise
     """
     video_name = os.path.basename(video_path)
-    print(f"\n{'='*80}")
-    print(f"🎬 Starting analysis for: {video_name}")
-    print(f"📁 Temporary files will be stored in: {get_temp_directory()}")
-    print(f"{'='*80}")
+    log.info("=" * 80)
+    log.info(f"🎬 Starting analysis for: {video_name}")
+    log.info(f"📁 Temporary files will be stored in: {get_temp_directory()}")
+    log.info("=" * 80)
     
     start_time = time.time()
+    # Separate small pool for analysis file writes, so analysis workers move on right away
+    io_pool = ThreadPoolExecutor(max_workers=4)
     
     try:
-        # Initialize components
+        # Per-video state (source duration) lives on the processor, so it is not shared
         video_processor = VideoProcessor(chunk_duration_minutes)
-        # Analyzer with user-selected options (uses factory to select Gemini or OpenRouter)
-        analyzer = create_analyzer(
-            prompt_type=prompt_type,
-            require_json_keyframes=require_json_keyframes,
-        )
-        combiner = ResultCombiner()
+        # Chunks and their analyses go to a per-video subdirectory, so parallel videos never collide
+        temp_dir = video_processor.video_temp_dir(video_path)
         
-        # Step 1: Split video into chunks if necessary
-        print("🔪 Step 1: Processing video chunks...")
-        chunk_paths = video_processor.split_video(video_path)
+        if hasattr(analyzer, "analyze_and_combine"):
+            # Async analyzer (OpenRouter): all chunk requests share one event loop and the
+            # combine request is sent as soon as the last chunk arrives
+            log.info("🔪 Step 1: Processing video chunks...")
+            chunks = list(video_processor.iter_chunks(video_path, cleanup_existing))
+            log.info(f"🤖 Step 2: Analyzing {len(chunks)} chunk(s) concurrently...")
+            chunk_infos, chunk_analyses, chunk_analysis_paths, final_analysis = asyncio.run(
+                analyze_video_chunks_async(analyzer, combiner, video_processor, chunks, temp_dir)
+            )
+            finish_video_analysis(
+                analyzer, combiner, video_path, chunk_infos, chunk_analyses, chunk_analysis_paths,
+                require_json_keyframes, start_time, final_analysis,
+            )
+            video_processor.remove_video_temp_dir(video_path)
+            return True
         
-        # Step 2: Analyze each chunk
-        print(f"\n🤖 Step 2: Analyzing {len(chunk_paths)} chunk(s) with Gemini...")
-        chunk_analyses = []
-        chunk_analysis_paths = []
-        collected_key_frames = []  # accumulate all key frames across chunks
+        # Steps 1-2: Split video into chunks and analyze each one as soon as ffmpeg produces it
+        log.info("🔪 Step 1: Processing video chunks...")
+        log.info(f"🤖 Step 2: Analyzing chunks with Gemini as they become ready...")
+        max_workers = max(1, _config.load()["GEMINI_MAX_CONCURRENT_REQUESTS"])
+        results = {}
+        # Chunk paths by index as ffmpeg produces them, for prefetching the next chunk due
+        chunk_paths = {}
         
-        for i, chunk_path in enumerate(chunk_paths):
-            # Get chunk information
-            chunk_info = video_processor.get_chunk_info(chunk_path, i, len(chunk_paths))
-            
-            # Analyze the chunk
+        def analyze_and_save(i: int, chunk_path: str, num_chunks: int):
+            # Workers take chunks in submission order, so chunk i + max_workers is the next one
+            # to start; warm it while this one is analyzed (unknown if ffmpeg hasn't produced it yet)
+            next_path = chunk_paths.get(i + max_workers)
+            if next_path:
+                prefetch_file(next_path)
+            chunk_info = video_processor.get_chunk_info(chunk_path, i, num_chunks)
+            # Chunks analyzed by an earlier run are answered from analysis_cache
             analysis_text = analyzer.analyze_video_chunk(chunk_path, chunk_info)
-            chunk_analyses.append(analysis_text)
-            # Collect key frames (if present)
-            if require_json_keyframes:
-                from result_combiner import ResultCombiner as RC
-                kf = RC.extract_key_frames_json(analysis_text)
-                if kf and isinstance(kf.get("key_frames"), list):
-                    # Adjust chunk-relative timecodes to absolute by adding chunk start offset
-                    start_offset_sec = int(chunk_info['index'] * (video_processor.chunk_duration_seconds))
-                    adjusted = []
-                    for item in kf["key_frames"]:
-                        tc = RC.timecode_to_seconds(item.get("timecode", "00:00:00"))
-                        abs_tc = RC.seconds_to_timecode(tc + start_offset_sec)
-                        adjusted.append({
-                            "timecode": abs_tc,
-                            "title": item.get("title", ""),
-                            "frame_description": item.get("frame_description", ""),
-                        })
-                    collected_key_frames.extend(adjusted)
-            
-            # Save chunk analysis to temporary file
-            temp_dir = get_temp_directory()
-            analysis_path = combiner.save_chunk_analysis(
-                analysis_text, chunk_path, chunk_info, temp_dir
+            # Save chunk analysis to temporary file in the background; resolved before Step 3
+            analysis_path_future = io_pool.submit(
+                combiner.save_chunk_analysis, analysis_text, chunk_path, chunk_info, temp_dir
             )
-            chunk_analysis_paths.append(analysis_path)
-            
-            print(f"✅ Completed analysis of chunk {i+1}/{len(chunk_paths)}")
-        
-        # Step 3: Combine analyses or use single analysis
-        print(f"\n🔗 Step 3: Creating final analysis...")
-        
-        if len(chunk_analyses) > 1:
-            # Multiple chunks - combine them
-            final_analysis = analyzer.combine_analyses(chunk_analyses, video_path)
-        else:
-            # Single chunk - use as is
-            final_analysis = chunk_analyses[0]
+            return chunk_info, analysis_text, analysis_path_future
         
-        # Step 4: Save final result
-        print(f"\n💾 Step 4: Saving final results...")
-        # Build unified key frames JSON if requested
-        kf_payload = None
-        if require_json_keyframes and collected_key_frames:
-            kf_payload = {"key_frames": collected_key_frames}
-        final_output_path = combiner.save_final_analysis(
-            final_analysis,
-            video_path,
-            require_json_keyframes=require_json_keyframes,
-            key_frames_data=kf_payload,
-        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for i, chunk_path, num_chunks in video_processor.iter_chunks(video_path, cleanup_existing):
+                chunk_paths[i] = chunk_path
+                futures[executor.submit(analyze_and_save, i, chunk_path, num_chunks)] = i
+            
+            total_chunks = len(futures)
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i] = future.result()
+                log.info(f"✅ Completed analysis of chunk {i+1}/{total_chunks} ({done}/{total_chunks} done)")
         
-        # Calculate processing time
-        processing_time = time.time() - start_time
+        # Reassemble in chunk order
+        ordered = [results[i] for i in sorted(results)]
+        chunk_infos = [chunk_info for chunk_info, _, _ in ordered]
+        chunk_analyses = [analysis_text for _, analysis_text, _ in ordered]
+        chunk_analysis_paths = [analysis_path_future.result() for _, _, analysis_path_future in ordered]
         
-        # Generate and display summary
-        summary = combiner.generate_summary_report(
-            chunk_analysis_paths, final_output_path, video_path, processing_time
+        finish_video_analysis(
+            analyzer, combiner, video_path, chunk_infos, chunk_analyses, chunk_analysis_paths,
+            require_json_keyframes, start_time,
         )
-        
-        print(f"\n✅ ANALYSIS COMPLETED SUCCESSFULLY for {video_name}!")
-        print(f"⏱️  Processing time: {processing_time:.1f} seconds ({processing_time/60:.1f} minutes)")
-        print(f"📄 Analysis saved to: {final_output_path}")
-        
-        # Show preview
-        print(f"\n📖 Preview of analysis:")
-        print("-" * 50)
-        preview_length = 300
-        if len(final_analysis) > preview_length:
-            print(final_analysis[:preview_length] + "...")
-        else:
-            print(final_analysis)
+        # Final result is saved; chunks are only kept for videos that did not finish
+        video_processor.remove_video_temp_dir(video_path)
         
         return True
         
     except Exception as e:
-        print(f"❌ Error processing {video_name}: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ Error processing {video_name}: {e}")
         return False
+    finally:
+        io_pool.shutdown(wait=True)
+
+
+def process_videos_batch(video_files: list[str], chunk_duration_minutes: int, require_json_keyframes: bool,
+                         analyzer, combiner: ResultCombiner) -> tuple[int, int]:
+    """
+    Analyze all chunks of all videos with one Vertex AI batch prediction job.
+    
+    Args:
+        video_files: Paths to the video files
+        chunk_duration_minutes: Duration for video chunks
+        require_json_keyframes: Whether key frames JSON should be requested
+        analyzer: Analyzer created in main (must support analyze_video_chunks_offline)
+        combiner: Result combiner created in main
+        
+    Returns:
+        (successful_count, failed_count)
+    """
+    start_time = time.time()
+    if not hasattr(analyzer, "analyze_video_chunks_offline"):
+        log.error("❌ Batch mode is only supported with ANALYZER_TYPE=gemini")
+        return 0, len(video_files)
+    # Checked before splitting, so a misconfigured run doesn't cut every video first
+    if not getattr(analyzer, "gcs_bucket", None):
+        log.error("❌ Batch mode requires GEMINI_UPLOAD_BUCKET to be set")
+        return 0, len(video_files)
+    
+    # Step 1: Split every video; chunks of all videos must stay on disk until the job is submitted
+    log.info("🔪 Step 1: Processing video chunks for all videos...")
+    videos = []  # (video_path, video_processor, chunk_paths, chunk_infos)
+    for video_path in video_files:
+        video_processor = VideoProcessor(chunk_duration_minutes)
+        try:
+            chunks = list(video_processor.iter_chunks(video_path))
+        except Exception as e:
+            log.error(f"❌ Error splitting {os.path.basename(video_path)}: {e}")
+            continue
+        chunk_infos = [video_processor.get_chunk_info(chunk_path, index, total) for index, chunk_path, total in chunks]
+        chunk_paths = [chunk_path for _, chunk_path, _ in chunks]
+        videos.append((video_path, video_processor, chunk_paths, chunk_infos))
+    if not videos:
+        return 0, len(video_files)
+    
+    # Step 2: One batch job for every chunk
+    items = [
+        (chunk_path, chunk_info)
+        for _, _, chunk_paths, chunk_infos in videos
+        for chunk_path, chunk_info in zip(chunk_paths, chunk_infos)
+    ]
+    log.info(f"🤖 Step 2: Analyzing {len(items)} chunk(s) with a Gemini batch prediction job...")
+    try:
+        analyses = analyzer.analyze_video_chunks_offline(items)
+    except Exception as e:
+        # Chunks stay on disk, so a rerun does not split the videos again
+        log.exception(f"❌ Batch prediction failed: {e}")
+        return 0, len(video_files)
+    
+    # Steps 3-4: Route results back to their videos
+    successful_count = 0
+    offset = 0
+    for video_path, video_processor, chunk_paths, chunk_infos in videos:
+        chunk_analyses = analyses[offset:offset + len(chunk_paths)]
+        offset += len(chunk_paths)
+        temp_dir = video_processor.video_temp_dir(video_path)
+        try:
+            chunk_analysis_paths = [
+                combiner.save_chunk_analysis(analysis_text, chunk_path, chunk_info, temp_dir)
+                for analysis_text, chunk_path, chunk_info in zip(chunk_analyses, chunk_paths, chunk_infos)
+            ]
+            finish_video_analysis(
+                analyzer, combiner, video_path, chunk_infos, chunk_analyses, chunk_analysis_paths,
+                require_json_keyframes, start_time,
+            )
+            video_processor.remove_video_temp_dir(video_path)
+            successful_count += 1
+        except Exception as e:
+            log.exception(f"❌ Error processing {os.path.basename(video_path)}: {e}")
+    
+    return successful_count, len(video_files) - successful_count
 
 
 def main():
     """Main function to process all videos in the input directory."""
+    parser = argparse.ArgumentParser(description="Analyze videos with Gemini or OpenRouter")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit all chunks as one Vertex AI batch prediction job (Gemini only, needs GEMINI_UPLOAD_BUCKET)",
+    )
+    parser.add_argument(
+        "--interactive",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Ask for prompt options (default); with --no-interactive use PROMPT_TYPE and REQUIRE_JSON_KEYFRAMES from config.env",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-analyze all chunks, ignoring cached analyses from earlier runs",
+    )
+    args = parser.parse_args()
+    # Cached analyses are keyed by chunk content, prompt and model; --force skips the lookup
+    analysis_cache.bypass_reads = args.force
 
     # Configuration from environment variables
     video_directory = os.getenv("VIDEO_INPUT_DIRECTORY", "video")
@@ -236,58 +474,98 @@ def main():
     print(f"{'='*80}")
 
     # Ask user for prompt options once per batch
-    prompt_type, require_json_keyframes = ask_prompt_options()
-    
-    # Ensure video directory exists
-    if not os.path.exists(video_directory):
-        print(f"📁 Creating video directory: {video_directory}")
-        ensure_directory_exists(video_directory)
-        print(f"✨ Directory created! Please place your video files in '{video_directory}/' and run the script again.")
-        return
-    
-    # Find all video files in the directory
-    video_files = find_video_files(video_directory)
-    
-    if not video_files:
-        print(f"📂 No video files found in '{video_directory}/' directory!")
-        print(f"Supported formats: MP4, AVI, MOV, MKV, WMV, FLV, WebM, M4V")
-        print(f"Please add video files to the '{video_directory}/' directory and try again.")
-        return
-    
-    print(f"🎬 Found {len(video_files)} video file(s) to process:")
-    for i, video_file in enumerate(video_files, 1):
-        print(f"   {i}. {os.path.basename(video_file)}")
-    
-    # Process each video file
-    successful_count = 0
-    failed_count = 0
-    total_start_time = time.time()
+    if args.interactive:
+        prompt_type, require_json_keyframes = ask_prompt_options()
+    else:
+        prompt_type, require_json_keyframes = default_prompt_options()
+        print(f"\nUsing prompt_type='{prompt_type}', require_json_keyframes={require_json_keyframes}")
     
-    for i, video_path in enumerate(video_files, 1):
-        print(f"\n🔄 Processing video {i}/{len(video_files)}")
+    # Interactive input is done; from here on all threads log through one writer thread
+    listener = setup_logging()
+    try:
+        # Ensure video directory exists
+        if not os.path.exists(video_directory):
+            log.info(f"📁 Creating video directory: {video_directory}")
+            ensure_directory_exists(video_directory)
+            log.info(f"✨ Directory created! Please place your video files in '{video_directory}/' and run the script again.")
+            return
         
-        success = process_single_video(video_path, chunk_duration_minutes, prompt_type, require_json_keyframes)
-        if success:
-            successful_count += 1
+        # Find all video files in the directory
+        video_files = find_video_files(video_directory)
+        
+        if not video_files:
+            log.info(f"📂 No video files found in '{video_directory}/' directory!")
+            log.info(f"Supported formats: MP4, AVI, MOV, MKV, WMV, FLV, WebM, M4V")
+            log.info(f"Please add video files to the '{video_directory}/' directory and try again.")
+            return
+        
+        log.info(f"🎬 Found {len(video_files)} video file(s) to process:")
+        for i, video_file in enumerate(video_files, 1):
+            log.info(f"   {i}. {os.path.basename(video_file)}")
+        
+        # Analyzer with user-selected options (uses factory to select Gemini or OpenRouter);
+        # built once so clients, credentials and connection pools are shared by all videos
+        try:
+            analyzer = create_analyzer(
+                prompt_type=prompt_type,
+                require_json_keyframes=require_json_keyframes,
+            )
+        except Exception as e:
+            log.exception(f"❌ Failed to initialize analyzer: {e}")
+            return
+        combiner = ResultCombiner()
+        
+        # Process each video file
+        video_parallelism = max(1, min(len(video_files), _config.load()["VIDEO_PARALLELISM"]))
+        successful_count = 0
+        failed_count = 0
+        total_start_time = time.time()
+        
+        if args.batch:
+            successful_count, failed_count = process_videos_batch(
+                video_files, chunk_duration_minutes, require_json_keyframes, analyzer, combiner
+            )
+        elif video_parallelism > 1:
+            log.info(f"🔄 Processing up to {video_parallelism} videos in parallel")
+            with ThreadPoolExecutor(max_workers=video_parallelism) as pool:
+                results = list(pool.map(
+                    lambda video_path: process_single_video(
+                        video_path, chunk_duration_minutes, require_json_keyframes, analyzer, combiner,
+                    ),
+                    video_files,
+                ))
+            successful_count = sum(results)
+            failed_count = len(results) - successful_count
         else:
-            failed_count += 1
-    
-    # Final summary
-    total_processing_time = time.time() - total_start_time
-    
-    print(f"\n{'='*80}")
-    print(f"🏁 BATCH PROCESSING COMPLETED!")
-    print(f"{'='*80}")
-    print(f"📊 Summary:")
-    print(f"   • Total videos: {len(video_files)}")
-    print(f"   • Successfully processed: {successful_count}")
-    print(f"   • Failed: {failed_count}")
-    print(f"   • Total processing time: {total_processing_time:.1f} seconds ({total_processing_time/60:.1f} minutes)")
-    
-    if failed_count > 0:
-        print(f"\n⚠️  Some videos failed to process. Check the error messages above.")
-    else:
-        print(f"\n🎉 All videos processed successfully!")
+            for i, video_path in enumerate(video_files, 1):
+                log.info(f"🔄 Processing video {i}/{len(video_files)}")
+            
+                success = process_single_video(
+                    video_path, chunk_duration_minutes, require_json_keyframes, analyzer, combiner,
+                )
+                if success:
+                    successful_count += 1
+                else:
+                    failed_count += 1
+        
+        # Final summary
+        total_processing_time = time.time() - total_start_time
+        
+        log.info("=" * 80)
+        log.info(f"🏁 BATCH PROCESSING COMPLETED!")
+        log.info("=" * 80)
+        log.info(f"📊 Summary:")
+        log.info(f"   • Total videos: {len(video_files)}")
+        log.info(f"   • Successfully processed: {successful_count}")
+        log.info(f"   • Failed: {failed_count}")
+        log.info(f"   • Total processing time: {total_processing_time:.1f} seconds ({total_processing_time/60:.1f} minutes)")
+        
+        if failed_count > 0:
+            log.warning(f"⚠️  Some videos failed to process. Check the error messages above.")
+        else:
+            log.info(f"🎉 All videos processed successfully!")
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
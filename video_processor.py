@@ -1,24 +1,43 @@
 # Video processing utilities for splitting videos into chunks using ffmpeg
 
+import hashlib
+import logging
+import math
 import os
+import shutil
 import subprocess
+import tempfile
+import time
 import json
-from typing import List
-from file_utils import get_temp_directory, cleanup_temp_directory
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import _config
+from file_utils import get_temp_directory, cleanup_temp_directory, atomic_write_text, ensure_directory_exists
+
+log = logging.getLogger(__name__)
+
+# How often the segment list is checked for newly closed chunks while ffmpeg is running
+_SEGMENT_POLL_INTERVAL = 0.5
 
 
 class VideoProcessor:
     """Handles video processing operations including splitting into chunks using ffmpeg."""
     
-    def __init__(self, chunk_duration_minutes: int = 10):
+    def __init__(self, chunk_duration_minutes: int = 10, max_chunk_bytes: int = 2 * 1024 ** 3):
         """
         Initialize video processor.
         
         Args:
-            chunk_duration_minutes: Duration of each chunk in minutes
+            chunk_duration_minutes: Maximum duration of each chunk in minutes
+            max_chunk_bytes: Maximum expected size of each chunk (Gemini accepts up to 2 GB per video)
         """
-        self.chunk_duration_seconds = chunk_duration_minutes * 60
+        self.max_chunk_seconds = chunk_duration_minutes * 60
+        self.max_chunk_bytes = max_chunk_bytes
+        # Actual chunk length, chosen per video by iter_chunks (at most max_chunk_seconds)
+        self.chunk_duration_seconds = self.max_chunk_seconds
         self.temp_dir = get_temp_directory()
+        # Duration of the last video passed to split_video, used to size chunks without ffprobe
+        self._source_duration: Optional[float] = None
     
     def get_video_duration(self, video_path: str) -> float:
         """
@@ -45,10 +64,41 @@ class VideoProcessor:
             return duration
             
         except (subprocess.CalledProcessError, KeyError, ValueError) as e:
-            print(f"Error getting video duration: {e}")
+            log.error(f"Error getting video duration: {e}")
             raise
     
-    def split_video(self, video_path: str, cleanup_existing: bool = True) -> List[str]:
+    def video_temp_dir(self, video_path: str) -> str:
+        """
+        Temporary subdirectory for one source video's chunks, manifest and chunk analyses.
+        
+        Named after the file plus a hash of its absolute path, so videos that share a base
+        name (a.mp4 and a.mkv) never write to the same files when processed in parallel.
+        
+        Args:
+            video_path: Path to the source video file
+            
+        Returns:
+            Path to the per-video temporary directory
+        """
+        base_filename = os.path.splitext(os.path.basename(video_path))[0]
+        path_hash = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.temp_dir, f"{base_filename}_{path_hash}")
+    
+    def remove_video_temp_dir(self, video_path: str) -> None:
+        """
+        Delete a video's chunks, manifest and chunk analyses.
+        
+        Called once the final analysis is saved, so temporary/ only keeps videos whose
+        processing was interrupted (their chunks are reused by the next run).
+        
+        Args:
+            video_path: Path to the source video file
+        """
+        video_dir = self.video_temp_dir(video_path)
+        shutil.rmtree(video_dir, ignore_errors=True)
+        log.info(f"Removed temporary files in {video_dir}")
+    
+    def split_video(self, video_path: str, cleanup_existing: bool = False) -> List[str]:
         """
         Split video into chunks using ffmpeg if it's longer than chunk duration.
         
@@ -59,53 +109,280 @@ class VideoProcessor:
         Returns:
             List of paths to video chunks (or original video if no splitting needed)
         """
+        return [chunk_path for _, chunk_path, _ in self.iter_chunks(video_path, cleanup_existing)]
+    
+    def iter_chunks(self, video_path: str, cleanup_existing: bool = False) -> Iterator[Tuple[int, str, int]]:
+        """
+        Split video like split_video, yielding each chunk as soon as ffmpeg has written it.
+        
+        The video is cut in one segment-muxer pass when possible, and each chunk is yielded as
+        soon as ffmpeg closes it; if the muxer fails before producing a chunk, chunks are extracted
+        individually and yielded in order as they finish. Either way a consumer can start
+        analyzing the first chunk while later ones are still being cut.
+        
+        Chunks are written to video_temp_dir(video_path). Chunks from a previous run are reused
+        without running ffmpeg when the manifest there still matches the source file and chunk limits.
+        
+        Args:
+            video_path: Path to the input video file
+            cleanup_existing: Whether to clean up existing chunks before processing
+            
+        Yields:
+            (chunk_index, chunk_path, total_chunks); chunks that failed to extract are skipped.
+            While the segment muxer runs, total_chunks is the planned count (raised if it cuts an
+            extra tail segment at the end)
+            
+        Raises:
+            RuntimeError: If the segment muxer fails after some chunks were already yielded
+        """
         if cleanup_existing:
             cleanup_temp_directory(self.temp_dir)
         
+        base_filename = os.path.splitext(os.path.basename(video_path))[0]
+        video_dir = self.video_temp_dir(video_path)
+        ensure_directory_exists(video_dir)
+        source_key = self._manifest_source_key(video_path)
+        manifest = self._load_manifest(video_dir, source_key)
+        if manifest is not None:
+            self._source_duration = manifest["duration"]
+            self.chunk_duration_seconds = manifest["chunk_duration_seconds"]
+            log.info(f"Reusing {len(manifest['chunks'])} existing chunk(s) for {os.path.basename(video_path)}")
+            for i, chunk_path in manifest["chunks"]:
+                yield i, chunk_path, manifest["total_chunks"]
+            return
+        
         duration = self.get_video_duration(video_path)
-        print(f"Video duration: {duration:.2f} seconds ({duration/60:.2f} minutes)")
+        self._source_duration = duration
+        log.info(f"Video duration: {duration:.2f} seconds ({duration/60:.2f} minutes)")
         
-        # If video is shorter than chunk duration, no need to split
-        if duration <= self.chunk_duration_seconds:
-            print("Video is shorter than chunk duration. No splitting needed.")
-            return [video_path]
+        # Fewest chunks that respect both the duration and the size limit, of equal length
+        num_chunks = max(
+            1,
+            math.ceil(duration / self.max_chunk_seconds),
+            math.ceil(source_key["size"] / self.max_chunk_bytes),
+        )
+        self.chunk_duration_seconds = math.ceil(duration / num_chunks)
         
-        # Calculate number of chunks needed
-        num_chunks = int(duration // self.chunk_duration_seconds) + (1 if duration % self.chunk_duration_seconds > 0 else 0)
-        print(f"Splitting video into {num_chunks} chunks of {self.chunk_duration_seconds/60} minutes each")
+        # If video fits into one chunk, no need to split
+        if num_chunks == 1:
+            log.info("Video fits into a single chunk. No splitting needed.")
+            self._write_manifest(video_dir, source_key, duration, [(0, video_path)], 1)
+            yield 0, video_path, 1
+            return
         
-        chunk_paths = []
-        base_filename = os.path.splitext(os.path.basename(video_path))[0]
+        log.info(f"Splitting video into {num_chunks} chunks of {self.chunk_duration_seconds/60:.1f} minutes each")
+        
+        # Preferred: one demux pass with the segment muxer, yielding chunks as they are closed
+        segment_paths = []
+        try:
+            for chunk_path in self._iter_segment_muxer(video_path, base_filename, video_dir):
+                segment_paths.append(chunk_path)
+                yield len(segment_paths) - 1, chunk_path, max(num_chunks, len(segment_paths))
+        except (subprocess.CalledProcessError, OSError) as e:
+            if segment_paths:
+                # Chunks already handed out can't be re-cut consistently by the fallback
+                raise RuntimeError(f"Segment muxer failed after {len(segment_paths)} chunk(s): {e}") from e
+            log.warning(f"Segment muxer failed ({e}), falling back to per-chunk extraction")
+        if segment_paths:
+            log.info(f"Video split into {len(segment_paths)} chunks successfully")
+            self._write_manifest(video_dir, source_key, duration, list(enumerate(segment_paths)), len(segment_paths))
+            return
+        
+        # Fallback: one ffmpeg process per chunk
+        created = []
+        
+        # Stream-copy extraction is mostly I/O; run a few ffmpeg processes at once
+        max_workers = max(1, min(num_chunks, _config.load()["FFMPEG_PARALLEL_CHUNKS"]))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self._extract_chunk, i, num_chunks, video_path, base_filename, video_dir)
+                for i in range(num_chunks)
+            ]
+            try:
+                # Wait in submission order so chunks are yielded sorted
+                for i, future in enumerate(futures):
+                    chunk_path = future.result()
+                    if chunk_path is not None:
+                        created.append((i, chunk_path))
+                        yield i, chunk_path, num_chunks
+            finally:
+                # Consumer stopped early: don't start the remaining extractions
+                for future in futures:
+                    future.cancel()
+        
+        log.info(f"Video split into {len(created)} chunks successfully")
+        # Only a complete split may be reused; otherwise retry the missing chunks next run
+        if len(created) == num_chunks:
+            self._write_manifest(video_dir, source_key, duration, created, num_chunks)
+    
+    def _manifest_source_key(self, video_path: str) -> dict:
+        """Identify the source file and chunk limits a set of chunks was produced from."""
+        st = os.stat(video_path)
+        return {
+            "video_path": os.path.abspath(video_path),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "max_chunk_seconds": self.max_chunk_seconds,
+            "max_chunk_bytes": self.max_chunk_bytes,
+        }
+    
+    @staticmethod
+    def _manifest_path(video_dir: str) -> str:
+        """Manifest of the chunks in a per-video temporary directory."""
+        return os.path.join(video_dir, ".manifest.json")
+    
+    def _load_manifest(self, video_dir: str, source_key: dict) -> Optional[dict]:
+        """
+        Load the chunk manifest for a video if it is still valid.
         
-        for i in range(num_chunks):
-            start_time = i * self.chunk_duration_seconds
-            chunk_filename = f"{base_filename}_chunk_{i+1:03d}.mp4"
-            chunk_path = os.path.join(self.temp_dir, chunk_filename)
+        Args:
+            video_dir: Per-video temporary directory (see video_temp_dir)
+            source_key: Result of _manifest_source_key for the current source file
             
-            print(f"Creating chunk {i+1}/{num_chunks}: starting at {start_time:.2f}s")
+        Returns:
+            Manifest dictionary, or None if missing, outdated or any listed chunk is gone
+        """
+        try:
+            with open(self._manifest_path(video_dir), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("source") != source_key:
+            return None
+        if not all(os.path.exists(chunk_path) for _, chunk_path in manifest["chunks"]):
+            return None
+        return manifest
+    
+    def _write_manifest(self, video_dir: str, source_key: dict, duration: float,
+                        chunks: List[Tuple[int, str]], total_chunks: int) -> None:
+        """Record a completed split so the next run can reuse its chunks."""
+        manifest = {
+            "source": source_key,
+            "duration": duration,
+            "chunk_duration_seconds": self.chunk_duration_seconds,
+            "total_chunks": total_chunks,
+            "chunks": chunks,
+        }
+        atomic_write_text(self._manifest_path(video_dir), json.dumps(manifest, ensure_ascii=False))
+    
+    def _iter_segment_muxer(self, video_path: str, base_filename: str, video_dir: str) -> Iterator[str]:
+        """
+        Split video into chunks in a single ffmpeg pass using the segment muxer.
+        
+        ffmpeg appends each chunk to the segment list once the chunk is closed, so the list is
+        polled while ffmpeg runs and chunks are yielded without waiting for the whole pass.
+        
+        Args:
+            video_path: Path to the input video file
+            base_filename: Source filename without extension, used to name the chunks
+            video_dir: Per-video temporary directory to write the chunks to
             
-            # Use ffmpeg to extract the chunk
-            cmd = [
-                'ffmpeg',
-                '-i', video_path,
-                '-ss', str(start_time),  # Start time
-                '-t', str(self.chunk_duration_seconds),  # Duration
-                '-c', 'copy',  # Copy streams without re-encoding for speed
-                '-avoid_negative_ts', 'make_zero',
-                '-y',  # Overwrite output file if exists
-                chunk_path
-            ]
+        Yields:
+            Chunk paths in order
             
+        Raises:
+            subprocess.CalledProcessError: If ffmpeg exits with an error
+            OSError: If ffmpeg can't be started
+        """
+        # '%' is special in the segment filename pattern
+        pattern = base_filename.replace('%', '%%') + "_chunk_%03d.mp4"
+        list_path = os.path.join(video_dir, ".segments.txt")
+        
+        cmd = [
+            'ffmpeg',
+            '-i', video_path,
+            '-map', '0',
+            '-c', 'copy',  # Copy streams without re-encoding for speed
+            '-f', 'segment',
+            '-segment_time', str(self.chunk_duration_seconds),
+            '-segment_start_number', '1',
+            '-segment_list', list_path,
+            '-segment_list_type', 'flat',
+            '-reset_timestamps', '1',
+            '-y',  # Overwrite output files if exist
+            os.path.join(video_dir, pattern)
+        ]
+        
+        # A list left by an interrupted run would name chunks this run hasn't written yet
+        if os.path.exists(list_path):
+            os.remove(list_path)
+        
+        # stderr goes to a file: an unread pipe could fill up and stall ffmpeg
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr_file)
+            yielded = 0
             try:
-                subprocess.run(cmd, capture_output=True, check=True)
-                chunk_paths.append(chunk_path)
+                while True:
+                    # Check for exit before reading, so the last read sees every segment
+                    finished = process.poll() is not None
+                    for name in self._read_segment_list(list_path)[yielded:]:
+                        yielded += 1
+                        yield os.path.join(video_dir, name)
+                    if finished:
+                        break
+                    time.sleep(_SEGMENT_POLL_INTERVAL)
                 
-            except subprocess.CalledProcessError as e:
-                print(f"Error creating chunk {i+1}: {e}")
-                continue
+                if process.returncode != 0:
+                    stderr_file.seek(0)
+                    raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr_file.read())
+            finally:
+                # Consumer stopped early or failed: don't leave ffmpeg running
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                if os.path.exists(list_path):
+                    os.remove(list_path)
+    
+    @staticmethod
+    def _read_segment_list(list_path: str) -> List[str]:
+        """Chunk names from a flat segment list, skipping a line ffmpeg is still writing."""
+        try:
+            with open(list_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        return [line.strip() for line in lines if line.endswith("\n") and line.strip()]
+    
+    def _extract_chunk(self, i: int, num_chunks: int, video_path: str, base_filename: str,
+                       video_dir: str) -> Optional[str]:
+        """
+        Extract a single chunk with ffmpeg.
         
-        print(f"Video split into {len(chunk_paths)} chunks successfully")
-        return chunk_paths
+        Args:
+            i: Chunk index (0-based)
+            num_chunks: Total number of chunks
+            video_path: Path to the input video file
+            base_filename: Source filename without extension, used to name the chunk
+            video_dir: Per-video temporary directory to write the chunk to
+            
+        Returns:
+            Path to the created chunk, or None if ffmpeg failed
+        """
+        start_time = i * self.chunk_duration_seconds
+        chunk_filename = f"{base_filename}_chunk_{i+1:03d}.mp4"
+        chunk_path = os.path.join(video_dir, chunk_filename)
+        
+        log.info(f"Creating chunk {i+1}/{num_chunks}: starting at {start_time:.2f}s")
+        
+        # Use ffmpeg to extract the chunk
+        cmd = [
+            'ffmpeg',
+            '-ss', str(start_time),  # Input-side seek: jump to the nearest keyframe instead of reading from the start
+            '-i', video_path,
+            '-t', str(self.chunk_duration_seconds),  # Duration
+            '-c', 'copy',  # Copy streams without re-encoding for speed
+            '-avoid_negative_ts', 'make_zero',
+            '-y',  # Overwrite output file if exists
+            chunk_path
+        ]
+        
+        try:
+            subprocess.run(cmd, capture_output=True, check=True)
+            return chunk_path
+            
+        except subprocess.CalledProcessError as e:
+            log.error(f"Error creating chunk {i+1}: {e}")
+            return None
     
     def get_chunk_info(self, chunk_path: str, chunk_index: int, total_chunks: int) -> dict:
         """
@@ -119,17 +396,22 @@ class VideoProcessor:
         Returns:
             Dictionary with chunk information
         """
-        try:
-            duration = self.get_video_duration(chunk_path)
-        except:
-            # Fallback to estimated duration
-            duration = self.chunk_duration_seconds
+        # Chunks are cut with -t chunk_duration_seconds, so only the last one can be shorter
+        duration = self.chunk_duration_seconds
+        if self._source_duration is not None:
+            # Stream-copy segments end on keyframes, so the muxer may emit a tail segment past
+            # the computed grid; don't let its estimate go negative
+            duration = max(0.0, min(duration, self._source_duration - chunk_index * self.chunk_duration_seconds))
+        
+        # Whole seconds (chunk_duration_seconds is an integer), so offsets need no float round-trip
+        start_seconds = chunk_index * self.chunk_duration_seconds
         
         return {
             'path': chunk_path,
             'index': chunk_index,
             'total_chunks': total_chunks,
             'duration': duration,
+            'start_seconds': start_seconds,
             'start_time_minutes': chunk_index * (self.chunk_duration_seconds / 60),
             'end_time_minutes': (chunk_index * (self.chunk_duration_seconds / 60)) + (duration / 60),
             'is_first': chunk_index == 0,